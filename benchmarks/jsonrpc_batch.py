@@ -0,0 +1,54 @@
+from typing import Callable, Any
+import timeit
+import uuid
+
+from extools import jsonrpc, json
+from extools.jsonrpc import decoders, selectors
+
+
+PAIR = '0xa43fe16908251ee70ef74718545e4fe6c5ccec9f'
+
+
+def uuid_dicts(size: int) -> bytes:
+    """
+    Batch as it was built before: uuid4 ids, nested dicts merged with `|`, serialized to `str` then encoded.
+    """
+    payload = {}
+    for _ in range(size):
+        id = str(uuid.uuid4())
+        payload = payload | {id: {
+            'payload': {
+                'jsonrpc': '2.0',
+                'id': id,
+                'method': 'eth_call',
+                'params': [{'to': PAIR, 'data': selectors.TOTAL_SUPPLY}, 'latest'],
+            },
+            'decoder': decoders.to_int,
+        }}
+    return json.dumps([value['payload'] for value in payload.values()]).encode()
+
+
+def batch(size: int) -> bytes:
+    calls = jsonrpc.Batch()
+    for _ in range(size):
+        calls.append(jsonrpc.Call(
+            method='eth_call',
+            params=[{'to': PAIR, 'data': selectors.TOTAL_SUPPLY}, 'latest'],
+            decoder=decoders.to_int,
+        ))
+    return calls.dumpb()
+
+
+def bench(name: str, build: Callable[[int], Any], size: int) -> None:
+    seconds = min(timeit.repeat(lambda: build(size), number=1, repeat=3))
+    print(f'{name:<12} {size:>8,} calls {seconds * 1000:>10,.1f} ms {len(build(size)) / size:>8.1f} bytes/call')
+
+
+def main():
+    for size in (1_000, 5_000, 20_000):
+        bench('uuid dicts', uuid_dicts, size)
+        bench('batch', batch, size)
+
+
+if __name__ == '__main__':
+    main()
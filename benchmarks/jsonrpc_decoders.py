@@ -0,0 +1,28 @@
+from typing import Callable, Any
+import timeit
+import os
+
+from extools.jsonrpc import decoders
+
+
+def bench(name: str, decode: Callable[[], Any], calls: int, number: int = 5) -> None:
+    seconds = min(timeit.repeat(decode, number=number, repeat=3))
+    print(f'{name:<24} {calls * number / seconds:>14,.0f} results/s')
+
+
+def main(size: int = 50_000):
+    ints = ['0x' + os.urandom(32).hex() for _ in range(size)]
+    reserves = ['0x' + os.urandom(14).hex().rjust(64, '0') * 2 + os.urandom(4).hex().rjust(64, '0') for _ in range(size)]
+    tokens = ['0x' + os.urandom(20).hex().rjust(64, '0') for _ in range(size // 50)]
+    addrs = [tokens[i % len(tokens)] for i in range(size)]
+
+    bench('to_int', lambda: [decoders.to_int(hex) for hex in ints], size)
+    bench('batch(to_int)', lambda: decoders.batch(decoders.to_int, ints), size)
+    bench('to_int_pair', lambda: [decoders.to_int_pair(hex) for hex in reserves], size)
+    bench('batch(to_int_pair)', lambda: decoders.batch(decoders.to_int_pair, reserves), size)
+    bench('to_addr', lambda: [decoders.to_addr(hex) for hex in addrs], size)
+    bench('batch(to_addr)', lambda: decoders.batch(decoders.to_addr, addrs), size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+from typing import Callable, Any
+import timeit
+import web3
+
+from extools import jsonrpc, utils
+from extools.jsonrpc import decoders, _types
+
+
+PAIR = '0xa43fe16908251ee70ef74718545e4fe6c5ccec9f'
+WALLET = '0x28c6c06298d514db089934071355e5743bf21d60'
+
+
+@jsonrpc.payloads.payload
+def keccak_per_call(contract: str, signature: str) -> _types.CallData:
+    """
+    Payload as built before the selector registry: keccak of the signature on every call.
+    """
+    return _types.CallData(
+        method='eth_call',
+        decoder=decoders.to_int,
+        params=[{'to': utils.to_checksum_address(contract), 'data': web3.Web3.keccak(text=signature).hex()}, 'latest'],
+    )
+
+
+@jsonrpc.payloads.payload
+def checksum_per_argument(contract: str, address: str) -> _types.CallData:
+    return _types.CallData(
+        method='eth_call',
+        decoder=decoders.to_int,
+        params=[
+            {
+                'to': utils.to_checksum_address(contract),
+                'data': f'0x70a08231000000000000000000000000{utils.to_checksum_address(address)[2:]}',
+            },
+            'latest',
+        ],
+    )
+
+
+def before(pair: str, address: str) -> tuple[dict[str, Any], ...]:
+    return (
+        keccak_per_call(pair, 'token0()'),
+        keccak_per_call(pair, 'getReserves()'),
+        keccak_per_call(pair, 'totalSupply()'),
+        checksum_per_argument(pair, address),
+    )
+
+
+def registry(pair: str, address: str) -> tuple[dict[str, Any], ...]:
+    return (
+        jsonrpc.payloads.token0(pair),
+        jsonrpc.payloads.get_reserves(pair),
+        jsonrpc.payloads.total_supply(pair),
+        jsonrpc.payloads.balance_of(pair, address),
+    )
+
+
+def bench(name: str, build: Callable[[str, str], Any], number: int = 25_000) -> None:
+    seconds = min(timeit.repeat(lambda: build(PAIR, WALLET), number=number, repeat=3))
+    print(f'{name:<16} {number * 4 / seconds:>12,.0f} calls/s')
+
+
+def main():
+    bench('keccak per call', before)
+    bench('registry', registry)
+
+
+if __name__ == '__main__':
+    main()
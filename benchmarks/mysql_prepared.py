@@ -0,0 +1,55 @@
+"""
+Needs a local MySQL/MariaDB, creates and drops table `bench_prepared`:
+`python -m benchmarks.mysql_prepared [database] [user] [password]`.
+`MySQL(prepare=True)` stays experimental until this has numbers.
+"""
+import asyncio
+import sys
+import time
+
+from extools.mysql import MySQL
+
+
+ROWS = 10_000
+QUERY = 'SELECT `id`, `pair`, `reserve0`, `reserve1` FROM `bench_prepared` WHERE `id` = %s AND `reserve0` > %s'
+
+
+async def bench(name: str, db: MySQL, seconds: float = 3, concurrency: int = 8) -> None:
+    done = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker(offset: int) -> None:
+        nonlocal done
+        i = offset
+        while time.perf_counter() < deadline:
+            await db.one(QUERY, (i % ROWS, 0))
+            i += concurrency
+            done += 1
+
+    await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+    print(f'{name:<12} {done / seconds:>10,.0f} queries/s')
+
+
+async def main(database: str = 'test', user: str = 'root', password: str = None):
+    db = MySQL(database=database, user=user, password=password, minsize=8, maxsize=8, row_factory='tuple')
+    if not await db.create_pool():
+        raise SystemExit('Could not connect')
+    await db.execute(
+        'CREATE TABLE IF NOT EXISTS `bench_prepared` '
+        '(`id` INT PRIMARY KEY, `pair` CHAR(42), `reserve0` BIGINT, `reserve1` BIGINT)'
+    )
+    await db.executemany(
+        'REPLACE INTO `bench_prepared` VALUES (%s, %s, %s, %s)',
+        [(i, f'0x{i:040x}', i * 7, i * 11) for i in range(ROWS)],
+    )
+    await bench('interpolated', db)
+    db.prepare = True
+    await bench('prepared', db)
+    print(f'prepared statements: {len(db.statements)}, not preparable: {list(db.unpreparable)}')
+    db.prepare = False
+    await db.execute('DROP TABLE `bench_prepared`')
+    await db.close_pool()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(*sys.argv[1:]))
@@ -0,0 +1,55 @@
+from typing import Any, Callable
+import random
+import timeit
+
+from extools import types
+from extools.mysql import _converter
+
+
+COLUMNS = ('id', 'block', 'pair', 'sender', 'amount0', 'amount1', 'timestamp', 'tx')
+
+
+def records(size: int) -> list[tuple[Any, ...]]:
+    """
+    Swap rows as fetched by a tuple cursor.
+    """
+    rng = random.Random(0)
+    return [(
+        i, 19_000_000 + i, f'0x{rng.getrandbits(160):040x}', f'0x{rng.getrandbits(160):040x}',
+        rng.getrandbits(63), rng.getrandbits(63), 1_700_000_000 + i, f'0x{rng.getrandbits(256):064x}',
+    ) for i in range(size)]
+
+
+def as_it_was(rows: list[tuple[Any, ...]]) -> list[Any]:
+    """
+    `DictCursor` dict, then copied into an `AttrDict`.
+    """
+    return [types.AttrDict(dict(zip(COLUMNS, row))) for row in rows]
+
+
+def access(rows: list[Any]) -> int:
+    if type(rows[0]) is tuple:
+        return sum(row[4] + row[5] for row in rows)
+    if type(rows[0]) is dict:
+        return sum(row['amount0'] + row['amount1'] for row in rows)
+    return sum(row.amount0 + row.amount1 for row in rows)
+
+
+def bench(name: str, convert: Callable[[list[tuple[Any, ...]]], list[Any]], rows: list[tuple[Any, ...]]) -> None:
+    build = min(timeit.repeat(lambda: convert(rows), number=1, repeat=5))
+    converted = convert(rows)
+    read = min(timeit.repeat(lambda: access(converted), number=1, repeat=5))
+    print(f'{name:<10} {len(rows):>9,} rows {build * 1000:>8.1f} ms build {read * 1000:>8.1f} ms access')
+
+
+def main():
+    for size in (10_000, 200_000):
+        rows = records(size)
+        bench('as it was', as_it_was, rows)
+        for factory in ('attrdict', 'lazy', 'dict', 'record', 'tuple'):
+            row = _converter(factory, COLUMNS)
+            bench(factory, lambda rows: [row(record) for record in rows], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Needs a local MySQL/MariaDB, creates and drops table `bench_transaction`:
+`python -m benchmarks.mysql_transaction [database] [user] [password]`.
+"""
+from typing import Callable, Awaitable
+import asyncio
+import sys
+import time
+
+from extools.mysql import MySQL
+
+
+STATEMENTS = 50
+
+
+async def per_statement(db: MySQL) -> None:
+    """
+    Unit of work as it was: an acquire and a commit per statement, reads included.
+    """
+    for i in range(STATEMENTS):
+        async with db.pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                if i % 2:
+                    await cursor.execute('SELECT `value` FROM `bench_transaction` WHERE `id` = %s', (i,))
+                else:
+                    await cursor.execute('UPDATE `bench_transaction` SET `value` = `value` + 1 WHERE `id` = %s', (i,))
+                await connection.commit()
+
+
+async def transaction(db: MySQL) -> None:
+    async with db.transaction() as tx:
+        for i in range(STATEMENTS):
+            if i % 2:
+                await tx.one('SELECT `value` FROM `bench_transaction` WHERE `id` = %s', i)
+            else:
+                await tx.execute('UPDATE `bench_transaction` SET `value` = `value` + 1 WHERE `id` = %s', i)
+
+
+async def readonly(db: MySQL) -> None:
+    async with db.transaction(readonly=True) as tx:
+        for i in range(STATEMENTS):
+            await tx.one('SELECT `value` FROM `bench_transaction` WHERE `id` = %s', i)
+
+
+async def bench(name: str, run: Callable[[MySQL], Awaitable], db: MySQL, repeat: int = 20) -> None:
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await run(db)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    print(f'{name:<14} {STATEMENTS} statements p50 {latencies[len(latencies) // 2] * 1000:>8.2f} ms '
+          f'p95 {latencies[int(len(latencies) * 0.95)] * 1000:>8.2f} ms')
+
+
+async def main(database: str = 'test', user: str = 'root', password: str = None):
+    db = MySQL(database=database, user=user, password=password)
+    if not await db.create_pool():
+        raise SystemExit('Could not connect')
+    await db.execute('CREATE TABLE IF NOT EXISTS `bench_transaction` (`id` INT PRIMARY KEY, `value` INT)')
+    await db.executemany('REPLACE INTO `bench_transaction` VALUES (%s, 0)', [(i,) for i in range(STATEMENTS)])
+    await bench('per statement', per_statement, db)
+    await bench('transaction', transaction, db)
+    await bench('readonly', readonly, db)
+    await db.execute('DROP TABLE `bench_transaction`')
+    await db.close_pool()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(*sys.argv[1:]))
@@ -0,0 +1,59 @@
+"""
+Needs a local redis-server, its database 15 is flushed: `python -m benchmarks.redis_bulk [redis://localhost:6379/15]`.
+"""
+from typing import Callable, Awaitable
+import asyncio
+import sys
+import time
+
+from extools.redis import RedisJSON
+
+
+async def fill(redis: RedisJSON, size: int) -> None:
+    async with redis.pipeline(transaction=False) as pipe:
+        for i in range(size):
+            pipe.set(f'pool:address:0x{i:040x}:chain:1:', '{"reserve0": 1, "reserve1": 2}')
+        await pipe.execute()
+
+
+async def clear_one_by_one(redis: RedisJSON) -> None:
+    """
+    `clear` as it was: a DEL round trip per scanned key.
+    """
+    async for key in redis.scan_iter():
+        await redis.delete(key)
+
+
+async def findall_one_by_one(redis: RedisJSON) -> int:
+    """
+    `findall` as it was: a GET round trip per found key.
+    """
+    return len([await redis.get(key) async for key in redis.findkeys(chain=1)])
+
+
+async def findall(redis: RedisJSON) -> int:
+    return len([value async for value in redis.findall(chain=1)])
+
+
+async def bench(name: str, run: Callable[[], Awaitable], size: int) -> None:
+    started = time.perf_counter()
+    await run()
+    seconds = time.perf_counter() - started
+    print(f'{name:<20} {size:>8,} keys {seconds * 1000:>10,.1f} ms')
+
+
+async def main(url: str):
+    redis = RedisJSON.from_url(url, decode_responses=True)
+    for size in (10_000, 100_000):
+        await redis.flushdb()
+        await fill(redis, size)
+        await bench('findall one by one', lambda: findall_one_by_one(redis), size)
+        await bench('findall mget', lambda: findall(redis), size)
+        await bench('clear one by one', lambda: clear_one_by_one(redis), size)
+        await fill(redis, size)
+        await bench('clear unlink', redis.clear, size)
+    await redis.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else 'redis://localhost:6379/15'))
@@ -0,0 +1,63 @@
+from typing import Any, Callable
+import random
+import timeit
+
+from extools import json, types
+from extools.codecs import Codec
+
+
+def snapshot(size: int) -> dict[str, Any]:
+    """
+    Pool snapshots as cached in Redis.
+    """
+    rng = random.Random(0)
+    return {'block': 19_000_000, 'pools': [{
+        'address': f'0x{rng.getrandbits(160):040x}',
+        'token0': f'0x{rng.getrandbits(160):040x}',
+        'token1': f'0x{rng.getrandbits(160):040x}',
+        'reserve0': rng.getrandbits(63),
+        'reserve1': rng.getrandbits(63),
+        'fee': 3000,
+        'symbol': rng.choice(('WETH', 'USDC', 'DAI', 'PEPE')),
+    } for _ in range(size)]}
+
+
+def legacy_dumps(value: Any) -> bytes:
+    """
+    `RedisJSON.set` as it was: orjson to `str`, encoded again by the client.
+    """
+    return json.dumps(value).encode()
+
+
+def legacy_loads(data: bytes) -> Any:
+    """
+    `RedisJSON.get` as it was: decoded to `str` by the client, orjson, `AttrDict`.
+    """
+    return types.AttrDict(json.loads(data.decode()))
+
+
+def bench(name: str, dumps: Callable[[Any], bytes], loads: Callable[[bytes], Any], value: Any) -> None:
+    data = dumps(value)
+    write = min(timeit.repeat(lambda: dumps(value), number=20, repeat=3)) / 20
+    read = min(timeit.repeat(lambda: loads(data), number=20, repeat=3)) / 20
+    print(f'{name:<16} {len(data):>12,} bytes {write * 1e6:>10,.0f} us dumps {read * 1e6:>10,.0f} us loads')
+
+
+def main():
+    codecs = {'json': Codec('json'), 'msgpack': Codec('msgpack')}
+    for compression in ('zstd', 'lz4'):
+        for format in ('json', 'msgpack'):
+            try:
+                codecs[f'{format}+{compression}'] = Codec(format, compression=compression, threshold=1024)
+            except ImportError as e:
+                print(f'{format}+{compression} skipped: {e}')
+    for size in (10, 1_000, 10_000):
+        value = snapshot(size)
+        print(f'{size:,} pools')
+        bench('legacy text', legacy_dumps, legacy_loads, value)
+        for name, codec in codecs.items():
+            bench(name, codec.dumps, lambda data: types.AttrDict(codec.loads(data)), value)
+
+
+if __name__ == '__main__':
+    main()
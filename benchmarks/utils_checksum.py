@@ -0,0 +1,35 @@
+from typing import Callable, Any
+from Crypto.Hash import keccak
+import timeit
+import os
+
+from extools import utils
+from extools.utils import _web3
+
+
+def nibblewise(address: str) -> str:
+    """
+    `to_checksum_address` as it was before: hex digest re-parsed with `int(hash[i], 16)` per character.
+    """
+    address = address.lower()
+    hash = '0x' + keccak.new(data=address[2:].encode(), digest_bits=256).hexdigest()
+    return '0x' + ''.join(address[i].upper() if int(hash[i], 16) > 7 else address[i] for i in range(2, 42))
+
+
+def bench(name: str, run: Callable[[], Any], calls: int, number: int = 3) -> None:
+    seconds = min(timeit.repeat(run, number=number, repeat=3))
+    print(f'{name:<28} {calls * number / seconds:>14,.0f} addresses/s')
+
+
+def main(size: int = 50_000, distinct: int = 2_000):
+    pool = ['0x' + os.urandom(20).hex() for _ in range(distinct)]
+    addresses = [pool[i % distinct] for i in range(size)]
+
+    bench('nibblewise', lambda: [nibblewise(address) for address in addresses], size)
+    bench('bytewise, uncached', lambda: [_web3._checksum.__wrapped__(address[2:]) for address in addresses], size)
+    bench('to_checksum_address', lambda: [utils.to_checksum_address(address) for address in addresses], size)
+    bench('to_checksum_addresses', lambda: utils.to_checksum_addresses(addresses), size)
+
+
+if __name__ == '__main__':
+    main()
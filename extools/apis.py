@@ -1,24 +1,112 @@
-from typing import Optional
+from typing import Optional, Union, Any, Callable, Coroutine, Hashable
 import asyncio as _asyncio
 import aiohttp as _aiohttp
 import abc as _abc
+import re as _re
+from datetime import datetime as _datetime, timezone as _timezone
+from email.utils import parsedate_to_datetime as _parsedate
+from urllib.parse import urlsplit as _urlsplit
 
 from . import logman, types, json, utils as _utils
 
 
+class _Batch:
+    """
+    Keys waiting to be loaded together, with their callers.
+    """
+    __slots__ = ('futures', 'timer')
+
+    def __init__(self, timer: _asyncio.TimerHandle):
+        self.futures: dict[str, list[_asyncio.Future]] = {}
+        self.timer: _asyncio.TimerHandle = timer
+
+
 class _API(_abc.ABC):
-    def __init__(self, logger: Optional[logman.Logger] = None):
+    """
+    Holds one lazily created `aiohttp.ClientSession` with keep-alive connections, reused by every request
+    until `__aexit__` (or `close`), so polling doesn't pay a TCP/TLS handshake per call.
+    Identical concurrent requests (URL and params) of all instances of the class share one in-flight request,
+    responses are cached in a class-wide `utils.TTLCache` for `ttl` sec and served stale (while refreshed
+    in the background) for `stale_ttl` more sec. Shared responses are the same object, don't mutate them.
+    """
+
+    def __init__(
+            self,
+            logger: Optional[logman.Logger] = None,
+            limit_per_host: int = 8,
+            keepalive_timeout: float = 75,
+            timeout: Optional[float] = 30,
+            ttl: Union[float, dict[str, float]] = 0,
+            stale_ttl: float = 0,
+            cache_size: int = 1024,
+    ):
+        """
+        :param ttl: Seconds responses are cached for, or by URL path fragment (e.g. `{'/simple/price': 10}`,
+        the longest fragment found in the path wins, `''` matches any). 0 disables caching.
+        :param stale_ttl: Seconds an expired response is still returned while it is refreshed.
+        :param cache_size: Max cached responses of the class, set by the first instance.
+        """
         self.logger: Optional[logman.Logger] = logger
+        self.limit_per_host: int = limit_per_host
+        self.keepalive_timeout: float = keepalive_timeout
+        self.timeout: Optional[float] = timeout
+        self.ttl: Union[float, dict[str, float]] = ttl
+        self.stale_ttl: float = stale_ttl
+        self.cache: _utils.TTLCache = self._shared('_cache', lambda: _utils.TTLCache(maxsize=cache_size))
+        self._inflight: dict[str, _asyncio.Task] = self._shared('_inflight', dict)
+        self._tasks: set[_asyncio.Task] = set()  # started by this instance, on its session
+        self.session: Optional[_aiohttp.ClientSession] = None
+        self._loop: Optional[_asyncio.AbstractEventLoop] = None
 
     @_abc.abstractmethod
     async def __call__(self, endpoint: str, **kwargs) -> Optional[types.JSONResponse]:
         ...
 
+    def _shared(self, name: str, factory: Callable[[], Any]) -> Any:
+        """
+        :return: Class attribute `name`, created by `factory` for each subclass on first use.
+        """
+        cls = self.__class__
+        if name not in cls.__dict__:
+            setattr(cls, name, factory())
+        return cls.__dict__[name]
+
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, _, __, ___):
-        ...
+        await self.close()
+
+    async def open(self) -> _aiohttp.ClientSession:
+        """
+        Lazily creates the session, recreating it if it was closed or belongs to another event loop.
+        :return: The session in use.
+        """
+        loop = _asyncio.get_running_loop()
+        if self.session is None or self.session.closed or self._loop is not loop:
+            try:
+                resolver = _aiohttp.AsyncResolver()  # aiodns
+            except RuntimeError:
+                resolver = None
+            self.session = _aiohttp.ClientSession(
+                connector=_aiohttp.TCPConnector(
+                    limit_per_host=self.limit_per_host,
+                    keepalive_timeout=self.keepalive_timeout,
+                    ttl_dns_cache=300,
+                    resolver=resolver,
+                ),
+                timeout=_aiohttp.ClientTimeout(total=self.timeout),
+                json_serialize=json.dumps,
+            )
+            self._loop = loop
+        return self.session
+
+    async def close(self) -> None:
+        if self._tasks:  # e.g. revalidating a stale response
+            await _asyncio.wait(self._tasks)
+        if self.session is not None and not self.session.closed and self._loop is _asyncio.get_running_loop():
+            await self.session.close()
+        self.session, self._loop = None, None
 
     async def request(
             self,
@@ -29,22 +117,95 @@ class _API(_abc.ABC):
             'accept': 'application/json',
             'content-type': 'application/json',
         }
+        params = kwargs.get('params') or ()
+        key = json.dumps([str(url), sorted(params.items() if hasattr(params, 'items') else params)])
+        response, fresh = self.cache.lookup(key)
+        if response is not None:
+            if not fresh:
+                self._fetch(key, url, kwargs)  # revalidate
+            return response
+        return await _asyncio.shield(self._fetch(key, url, kwargs))
+
+    def _fetch(self, key: str, url: types.URL, kwargs: dict[str, Any]) -> _asyncio.Task:
+        """
+        :return: The in-flight request of `key`, started if there is none.
+        """
+        if (task := self._inflight.get(key)) is None:
+            task = self._inflight[key] = self._spawn(self._load(key, url, kwargs))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def _load(self, key: str, url: types.URL, kwargs: dict[str, Any]) -> Optional[types.JSONResponse]:
         try:
-            async with _aiohttp.ClientSession(
-                    json_serialize=json.dumps,
-            ) as session:
-                async with session.get(
-                        url=url,
-                        **kwargs,
-                ) as r:
-                    return await r.json()
+            status, response = await self._get(url, **kwargs)
         except Exception as e:
             if self.logger:
                 self.logger.error(e)
+            return None
+        if 200 <= status < 300 and response is not None and (ttl := self._ttl(url)):  # not error bodies
+            self.cache.set(key, response, ttl=ttl, stale_ttl=self.stale_ttl)
+        return response
+
+    def _ttl(self, url: types.URL) -> float:
+        if not isinstance(self.ttl, dict):
+            return self.ttl
+        path = _urlsplit(str(url)).path
+        fragment = max((fragment for fragment in self.ttl if fragment in path), key=len, default=None)
+        return 0 if fragment is None else self.ttl[fragment]
+
+    def _spawn(self, coro: Coroutine) -> _asyncio.Task:
+        task = _asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _get(self, url: types.URL, **kwargs) -> tuple[int, Optional[types.JSONResponse]]:
+        """
+        :return: HTTP status and JSON body, of an error too.
+        """
+        session = await self.open()
+        async with session.get(
+                url=url,
+                **kwargs,
+        ) as r:
+            return r.status, await r.json()
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    :param value: `Retry-After` header, delay in seconds or HTTP date.
+    :return: Seconds to wait, `None` if missing or malformed.
+    """
+    if value is None:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, (_parsedate(value) - _datetime.now(_timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
 
 
 class _RateLimitedAPI(_API, _abc.ABC):
-    _fetched_at: float = float('-inf')
+    """
+    Every request takes a token of `limiter`, by default a `TokenBucket` shared by all instances of the class
+    (`rate` per minute, `burst` at once). A 429 blocks the limiter for its `Retry-After` and is retried.
+    Pass a `utils.RedisTokenBucket` as `limiter` to share the budget between processes.
+    """
+    burst: int = 1
+
+    def __init__(
+            self,
+            logger: Optional[logman.Logger] = None,
+            limiter: Optional[_utils.TokenBucket] = None,
+            retries: int = 2,
+            **kwargs,
+    ):
+        super().__init__(logger=logger, **kwargs)
+        self.limiter: _utils.TokenBucket = limiter or self._shared(
+            '_limiter', lambda: _utils.TokenBucket(rate=self.rate / 60, burst=self.burst),
+        )
+        self.retries: int = retries
 
     @property
     @_abc.abstractmethod
@@ -54,52 +215,168 @@ class _RateLimitedAPI(_API, _abc.ABC):
         :return:
         """
 
-    async def __aenter__(self):
-        passed_sec = _utils.unixnow() - self.__class__._fetched_at
-        delay_sec = 60 / self.rate
+    async def _get(self, url: types.URL, **kwargs) -> tuple[int, Optional[types.JSONResponse]]:
+        for attempt in range(self.retries + 1):
+            await self.limiter.acquire()
+            session = await self.open()
+            async with session.get(
+                    url=url,
+                    **kwargs,
+            ) as r:
+                if r.status != 429:
+                    return r.status, await r.json()
+                delay = _retry_after(r.headers.get('Retry-After'))
+                await self.limiter.block(60 / self.rate if delay is None else delay)
+                if attempt == self.retries:
+                    return r.status, await r.json()
 
-        if passed_sec < delay_sec:
-            await _asyncio.sleep(delay_sec - passed_sec)
-        self.__class__._fetched_at = _utils.unixnow()
 
-        return self
+class _BatchedAPI(_API, _abc.ABC):
+    """
+    For providers accepting address lists: with `batch_window`, single-token lookups are collected for
+    `batch_window` sec (or until `batch_size` of them) and packed into one request by `_load_batch`.
+    """
+    batch_size: int = 1
 
+    def __init__(
+            self,
+            logger: Optional[logman.Logger] = None,
+            batch_window: Optional[float] = None,
+            **kwargs,
+    ):
+        """
+        :param batch_window: Seconds single-token lookups wait for others to be packed with, `None` to not pack.
+        """
+        super().__init__(logger=logger, **kwargs)
+        self.batch_window: Optional[float] = batch_window
+        self._batches: dict[Hashable, _Batch] = self._shared('_batches', dict)
+
+    async def _batched(self, group: Hashable, key: str) -> Optional[types.JSONResponse]:
+        """
+        :param group: Keys of the same group are loaded together by `_load_batch`.
+        :return: Response to the lookup of `key` alone.
+        """
+        loop = _asyncio.get_running_loop()
+        if (batch := self._batches.get(group)) is None:
+            batch = self._batches[group] = _Batch(loop.call_later(self.batch_window, self._flush, group))
+        future = loop.create_future()
+        batch.futures.setdefault(key, []).append(future)
+        if len(batch.futures) >= self.batch_size:
+            self._flush(group)
+        return await future
+
+    def _flush(self, group: Hashable) -> None:
+        if (batch := self._batches.pop(group, None)) is not None:
+            batch.timer.cancel()
+            self._spawn(self._fan_out(group, batch.futures))
+
+    async def _fan_out(self, group: Hashable, futures: dict[str, list[_asyncio.Future]]) -> None:
+        try:
+            responses = await self._load_batch(group, list(futures))
+        except Exception as e:
+            responses = {}
+            if self.logger:
+                self.logger.error(e)
+        for key, waiting in futures.items():
+            for future in waiting:
+                if not future.done():
+                    future.set_result(responses.get(key))
+
+    @_abc.abstractmethod
+    async def _load_batch(self, group: Hashable, keys: list[str]) -> dict[str, Optional[types.JSONResponse]]:
+        """
+        :return: Response to the lookup of each key alone.
+        """
+
+
+class DexScreener(_BatchedAPI, _RateLimitedAPI):
+    burst: int = 5
+    batch_size: int = 30
 
-class DexScreener(_RateLimitedAPI):
     @property
     def rate(self):
         return 300
 
     async def __call__(self, endpoint: str, **kwargs) -> Optional[types.JSONResponse]:
+        if self.batch_window is not None and not kwargs and (match := _re.fullmatch(r'/tokens/([^/,]+)', endpoint)):
+            return await self._batched('tokens', match[1])
         return await super().request(
             url=f'https://api.dexscreener.com/latest/dex{endpoint}',
             **kwargs,
         )
 
+    async def _load_batch(self, group: Hashable, keys: list[str]) -> dict[str, Optional[types.JSONResponse]]:
+        response = await super().request(url=f'https://api.dexscreener.com/latest/dex/tokens/{",".join(keys)}')
+        if response is None:
+            return {}
+        pairs = response.get('pairs') or []
+        return {key: {
+            'schemaVersion': response.get('schemaVersion'),
+            'pairs': [pair for pair in pairs if key.lower() in (
+                pair['baseToken']['address'].lower(),
+                pair['quoteToken']['address'].lower(),
+            )] or None,
+        } for key in keys}
+
+
+class GeckoTerminal(_BatchedAPI, _RateLimitedAPI):
+    batch_size: int = 30
 
-class GeckoTerminal(_RateLimitedAPI):
     @property
     def rate(self):
         return 30
 
     async def __call__(self, endpoint: str, **kwargs) -> Optional[types.JSONResponse]:
+        if self.batch_window is not None and not kwargs and \
+                (match := _re.fullmatch(r'/simple/networks/([^/]+)/token_price/([^/,]+)', endpoint)):
+            return await self._batched(match[1], match[2])
         return await super().request(
             url=f'https://api.geckoterminal.com/api/v2{endpoint}',
             **kwargs,
         )
 
+    async def _load_batch(self, group: Hashable, keys: list[str]) -> dict[str, Optional[types.JSONResponse]]:
+        response = await super().request(
+            url=f'https://api.geckoterminal.com/api/v2/simple/networks/{group}/token_price/{",".join(keys)}',
+        )
+        if response is None:
+            return {}
+        data = response.get('data') or {}
+        prices = {k.lower(): v for k, v in ((data.get('attributes') or {}).get('token_prices') or {}).items()}
+        return {key: {'data': data | {'attributes': {'token_prices': {
+            key.lower(): prices[key.lower()],
+        } if key.lower() in prices else {}}}} for key in keys}
+
+
+class CoinGecko(_BatchedAPI, _RateLimitedAPI):
+    batch_size: int = 30
 
-class CoinGecko(_RateLimitedAPI):
     @property
     def rate(self):
         return 30
 
     async def __call__(self, endpoint: str, **kwargs) -> Optional[types.JSONResponse]:
+        params = kwargs.get('params') or {}
+        if self.batch_window is not None and kwargs.keys() == {'params'} and isinstance(params, dict) \
+                and (match := _re.fullmatch(r'/simple/token_price/([^/]+)', endpoint)) \
+                and ',' not in (address := params.get('contract_addresses') or ','):
+            others = tuple(sorted((k, v) for k, v in params.items() if k != 'contract_addresses'))
+            return await self._batched((match[1], others), address)
         return await super().request(
             url=f'https://api.coingecko.com/api/v3{endpoint}',
             **kwargs,
         )
 
+    async def _load_batch(self, group: Hashable, keys: list[str]) -> dict[str, Optional[types.JSONResponse]]:
+        platform, others = group
+        response = await super().request(
+            url=f'https://api.coingecko.com/api/v3/simple/token_price/{platform}',
+            params=dict(others) | {'contract_addresses': ','.join(keys)},
+        )
+        if response is None:
+            return {}
+        return {key: {key.lower(): response[key.lower()]} if key.lower() in response else {} for key in keys}
+
 
 class DexTools(_RateLimitedAPI):
     KEY: str = ...
@@ -108,8 +385,8 @@ class DexTools(_RateLimitedAPI):
     def rate(self):
         return 120
 
-    def __init__(self, logger: Optional[logman.Logger] = None):
-        super().__init__(logger=logger)
+    def __init__(self, logger: Optional[logman.Logger] = None, **kwargs):
+        super().__init__(logger=logger, **kwargs)
 
     async def __call__(self, endpoint: str, **kwargs) -> Optional[types.JSONResponse]:
         return await super().request(  # no `json.dumps(params)`
@@ -0,0 +1,107 @@
+from typing import Any, Optional, Callable
+
+from . import json
+
+try:
+    import msgpack
+except ImportError:  # optional
+    msgpack = None
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+try:
+    import lz4.frame
+except ImportError:  # optional
+    lz4 = None
+
+
+MAGIC = b'\x00'  # never starts JSON text, values without it are read as legacy JSON
+FORMATS = {'json': b'j', 'msgpack': b'm'}
+COMPRESSIONS = {None: b'-', 'zstd': b'z', 'lz4': b'l'}
+
+
+def _dumps(format: bytes) -> Callable[[Any], bytes]:
+    if format == b'm':
+        if msgpack is None:
+            raise ImportError('`msgpack` is required for the msgpack format')
+        return msgpack.packb
+    return json.dumpb
+
+
+def _loads(format: bytes) -> Callable[[bytes], Any]:
+    if format == b'm':
+        if msgpack is None:
+            raise ImportError('`msgpack` is required for the msgpack format')
+        return msgpack.unpackb
+    return json.loads
+
+
+def _compress(compression: bytes, data: bytes, level: Optional[int]) -> bytes:
+    if compression == b'z':
+        if zstandard is None:
+            raise ImportError('`zstandard` is required for zstd compression')
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compress(data)
+    if compression == b'l':
+        if lz4 is None:
+            raise ImportError('`lz4` is required for lz4 compression')
+        return lz4.frame.compress(data, compression_level=level or 0)
+    return data
+
+
+def _decompress(compression: bytes, data: bytes) -> bytes:
+    if compression == b'z':
+        if zstandard is None:
+            raise ImportError('`zstandard` is required for zstd compression')
+        return zstandard.ZstdDecompressor().decompress(data)
+    if compression == b'l':
+        if lz4 is None:
+            raise ImportError('`lz4` is required for lz4 compression')
+        return lz4.frame.decompress(data)
+    return data
+
+
+class Codec:
+    """
+    Serializes values to bytes tagged with a 3 byte header: `MAGIC`, format and compression,
+    so values written with any codec (or as plain JSON text) can be read by every other.
+    """
+
+    def __init__(
+            self,
+            format: str = 'json',
+            compression: Optional[str] = None,
+            threshold: int = 4096,
+            level: Optional[int] = None,
+    ):
+        """
+        :param format: 'json' (orjson) or 'msgpack'.
+        :param compression: None, 'zstd' or 'lz4', only applied to values of at least `threshold` bytes.
+        :param level: Compression level, the library's default if `None`.
+        """
+        self.format: bytes = FORMATS[format]
+        self.compression: bytes = COMPRESSIONS[compression]
+        self.threshold: int = threshold
+        self.level: Optional[int] = level
+        self._dumps: Callable[[Any], bytes] = _dumps(self.format)
+        _compress(self.compression, b'', level)  # fails early if the library is missing
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(format={self.format!r}, compression={self.compression!r})'
+
+    def dumps(self, value: Any) -> bytes:
+        data = self._dumps(value)
+        if self.compression != b'-' and len(data) >= self.threshold:
+            return MAGIC + self.format + self.compression + _compress(self.compression, data, self.level)
+        return MAGIC + self.format + b'-' + data
+
+    @staticmethod
+    def tagged(data: bytes) -> bool:
+        return data[:1] == MAGIC
+
+    @staticmethod
+    def loads(data: bytes) -> Any:
+        """
+        :param data: Tagged value, see `tagged`.
+        """
+        return _loads(data[1:2])(_decompress(data[2:3], memoryview(data)[3:]))
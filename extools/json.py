@@ -6,5 +6,9 @@ def dumps(__obj, /) -> str:
     return orjson.dumps(__obj).decode()
 
 
+def dumpb(__obj, /) -> bytes:
+    return orjson.dumps(__obj)
+
+
 def loads(__obj, /) -> Any:
     return orjson.loads(__obj)
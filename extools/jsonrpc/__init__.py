@@ -1,2 +1,8 @@
-from ._request import request
+from ._client import JsonRpcClient
+from ._router import JsonRpcRouter, Endpoint
+from ._websocket import JsonRpcWebSocket
+from ._batch import Call, Batch
+from ._errors import RpcError, BatchError
+from ._cache import ResponseCache, MemoryCache, RedisCache
+from ._request import request, client
 from . import payloads
@@ -0,0 +1,81 @@
+from typing import Iterable, Union
+import itertools
+
+from . import _types
+from .. import json
+
+
+_ids = itertools.count(1)
+
+
+class Call:
+    """
+    Pending JSON-RPC call, the request object itself is only built when serialized.
+    """
+    __slots__ = ('id', 'method', 'params', 'decoder')
+
+    def __init__(
+            self,
+            method: _types.CallMethod,
+            params: _types.CallParams,
+            decoder: _types.Decoder,
+            id: _types.CallID | None = None,
+    ):
+        self.id: _types.CallID = next(_ids) if id is None else id
+        self.method: _types.CallMethod = method
+        self.params: _types.CallParams = params
+        self.decoder: _types.Decoder = decoder
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(id={self.id}, method={self.method!r}, params={self.params!r})'
+
+    def __or__(self, other: Union['Call', 'Batch']) -> 'Batch':
+        return Batch((self,)) | other
+
+    def dump(self) -> _types.Payload:
+        return {'jsonrpc': '2.0', 'id': self.id, 'method': self.method, 'params': self.params}
+
+    def dumpb(self) -> bytes:
+        return json.dumpb(self.dump())
+
+
+class Batch(dict[_types.CallID, Call]):
+    """
+    Ordered calls by id. Build it with `append`/`extend` (or `|=`), which is linear,
+    `a | b` copies and is kept for compatibility with payloads merged like dicts.
+    """
+
+    def __init__(self, calls: Iterable[Call] = ()):
+        super().__init__((call.id, call) for call in calls)
+
+    @classmethod
+    def of(cls, payload: Union[Call, 'Batch', dict[_types.CallID, Call]]) -> 'Batch':
+        """
+        :return: The payload as a `Batch`, itself if it already is one.
+        """
+        if isinstance(payload, Call):
+            return cls((payload,))
+        return payload if isinstance(payload, Batch) else cls(payload.values())
+
+    def append(self, call: Call) -> 'Batch':
+        self[call.id] = call
+        return self
+
+    def extend(self, calls: Union[Call, Iterable[Call], dict[_types.CallID, Call]]) -> 'Batch':
+        if isinstance(calls, Call):
+            return self.append(calls)
+        for call in (calls.values() if isinstance(calls, dict) else calls):
+            self[call.id] = call
+        return self
+
+    def __or__(self, other: Union[Call, 'Batch']) -> 'Batch':
+        return Batch(self.values()).extend(other)
+
+    def __ior__(self, other: Union[Call, 'Batch']) -> 'Batch':
+        return self.extend(other)
+
+    def dumpb(self) -> bytes:
+        return json.dumpb([call.dump() for call in self.values()])
+
+
+Calls = Union[Call, Batch, dict[_types.CallID, Call]]
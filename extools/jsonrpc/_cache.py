@@ -0,0 +1,121 @@
+from typing import Optional, Any, Iterable, TYPE_CHECKING
+import abc
+
+from . import selectors
+from ._batch import Call
+from .. import utils, json
+
+if TYPE_CHECKING:
+    from ..redis import RedisJSON
+
+
+TAGS = {'latest', 'pending', 'earliest', 'safe', 'finalized'}
+BY_HASH = {
+    'eth_getBlockByHash',
+    'eth_getBlockTransactionCountByHash',
+    'eth_getTransactionByHash',
+    'eth_getTransactionByBlockHashAndIndex',
+    'eth_getTransactionReceipt',
+}
+AT_BLOCK = {  # method: index of the block identifier in params
+    'eth_call': 1,
+    'eth_getBalance': 1,
+    'eth_getCode': 1,
+    'eth_getTransactionCount': 1,
+    'eth_getStorageAt': 2,
+    'eth_getBlockByNumber': 0,
+}
+CONSTANT = {  # no-argument getters that never change once a contract is deployed
+    selectors.TOKEN0,
+    selectors.TOKEN1,
+    selectors.SYMBOL,
+    selectors.NAME,
+    selectors.DECIMALS,
+}
+
+
+def _pinned(identifier: Any) -> bool:
+    if isinstance(identifier, dict):
+        return 'blockHash' in identifier
+    if isinstance(identifier, int):
+        return True
+    return isinstance(identifier, str) and identifier not in TAGS
+
+
+def key(call: Call) -> Optional[str]:
+    """
+    :return: Cache key if the call result is immutable, `None` if it depends on the chain head.
+    """
+    method, params = call.method, call.params
+    if method == 'eth_call' and isinstance(params[0], dict) and params[0].keys() == {'to', 'data'} \
+            and params[0]['data'] in CONSTANT:
+        return f'eth_call:{params[0]["to"].lower()}:{params[0]["data"]}'
+    if method in BY_HASH or (method in AT_BLOCK and len(params) > AT_BLOCK[method] and _pinned(params[AT_BLOCK[method]])):
+        return json.dumps([method, params])
+    return None
+
+
+def final(call: Call, result: Any) -> bool:
+    """
+    :return: Whether a result of a call with a cache `key` can be stored: not `null`, not empty `0x`
+    (e.g. a getter of an address without code yet) and not a transaction that is still pending.
+    """
+    if result is None or result == '0x':
+        return False
+    if call.method == 'eth_getTransactionByHash':
+        return result.get('blockHash') is not None
+    return True
+
+
+class ResponseCache(abc.ABC):
+    """
+    Storage of raw (not yet decoded) results of immutable calls.
+    """
+
+    @abc.abstractmethod
+    async def get(self, keys: Iterable[str]) -> dict[str, Any]:
+        """
+        :return: Cached results of the found keys.
+        """
+
+    @abc.abstractmethod
+    async def set(self, results: dict[str, Any]) -> None:
+        ...
+
+
+class MemoryCache(ResponseCache):
+    def __init__(self, maxsize: int = 100_000):
+        self.lru: utils.LRUCache = utils.LRUCache(maxsize=maxsize)
+
+    async def get(self, keys: Iterable[str]) -> dict[str, Any]:
+        missing = object()
+        return {key: value for key in keys if (value := self.lru.get(key, missing)) is not missing}
+
+    async def set(self, results: dict[str, Any]) -> None:
+        for key, value in results.items():
+            self.lru.set(key, value)
+
+
+class RedisCache(ResponseCache):
+    """
+    Shares cached results between workers, values are stored as JSON text under `prefix`.
+    """
+
+    def __init__(self, redis: 'RedisJSON', prefix: str = 'jsonrpc', ttl: Optional[int] = None):
+        self.redis: 'RedisJSON' = redis
+        self.prefix: str = prefix
+        self.ttl: Optional[int] = ttl
+
+    async def get(self, keys: Iterable[str]) -> dict[str, Any]:
+        if not (keys := list(keys)):
+            return {}
+        values = await self.redis.mget([f'{self.prefix}:{key}' for key in keys])
+        return {key: json.loads(value) for key, value in zip(keys, values) if value is not None}
+
+    async def set(self, results: dict[str, Any]) -> None:
+        if not results:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, value in results.items():
+                pipe.set(f'{self.prefix}:{key}', json.dumps(value), ex=self.ttl)
+            await pipe.execute()
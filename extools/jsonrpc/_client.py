@@ -0,0 +1,376 @@
+from typing import Optional, Any, Iterator, AsyncGenerator
+import asyncio
+import aiohttp
+
+from . import _types, _errors, _multicall, _cache, _stream, decoders
+from ._batch import Call, Batch, Calls
+from .. import json
+
+
+_NO_RESPONSE = {'code': None, 'message': 'No response'}
+
+
+class JsonRpcClient:
+    """
+    Long-lived JSON-RPC client that keeps one `aiohttp.ClientSession` (and its connection pool) open
+    between batches, so consecutive requests reuse warm keep-alive connections and cached DNS records.
+    Concurrent batches are multiplexed over the pool, up to `limit_per_host` connections per node.
+    Payloads above `max_calls` calls or `max_bytes` serialized bytes are split into chunks that are
+    sent concurrently (at most `concurrency` at once per request) and reassembled in the original order.
+    With `multicall` set, plain `eth_call`s sharing a block are packed into Multicall3 `aggregate3` calls
+    of at most `multicall` calls each; results are routed back so the returned tuple is unchanged.
+    With a `cache`, results of immutable calls (by-hash lookups, pinned blocks, constant getters) are served
+    from it without network I/O and only the misses are sent.
+    Calls that fail or stay unanswered are resent alone (never aggregated again), up to `retries` times; `results` returns
+    a success or error per call, `request` raises `BatchError` holding the partial results.
+    """
+
+    def __init__(
+            self,
+            url: Optional[str] = None,
+            limit: int = 100,
+            limit_per_host: int = 32,
+            keepalive_timeout: float = 75,
+            dns_cache_ttl: int = 300,
+            timeout: Optional[float] = 60,
+            max_calls: Optional[int] = 1000,
+            max_bytes: Optional[int] = 1024 * 1024,
+            concurrency: int = 8,
+            multicall: Optional[int] = None,
+            multicall_address: str = _multicall.ADDRESS,
+            cache: Optional[_cache.ResponseCache] = None,
+            retries: int = 2,
+            backoff: float = 0.5,
+    ):
+        self.url: Optional[str] = url
+        self.limit: int = limit
+        self.limit_per_host: int = limit_per_host
+        self.keepalive_timeout: float = keepalive_timeout
+        self.dns_cache_ttl: int = dns_cache_ttl
+        self.timeout: Optional[float] = timeout
+        self.max_calls: Optional[int] = max_calls
+        self.max_bytes: Optional[int] = max_bytes
+        self.concurrency: int = concurrency
+        self.multicall: Optional[int] = multicall
+        self.multicall_address: str = multicall_address
+        self.cache: Optional[_cache.ResponseCache] = cache
+        self.retries: int = retries
+        self.backoff: float = backoff
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, _, __, ___):
+        await self.close()
+
+    async def open(self) -> aiohttp.ClientSession:
+        """
+        Lazily creates the session, recreating it if it was closed or belongs to another event loop.
+        :return: The session in use.
+        """
+        loop = asyncio.get_running_loop()
+        if self.session is None or self.session.closed or self._loop is not loop:
+            self.session = aiohttp.ClientSession(
+                connector=self._connector(),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                json_serialize=json.dumps,
+                headers={
+                    'accept': 'application/json',
+                    'Content-Type': 'application/json',
+                },
+            )
+            self._loop = loop
+        return self.session
+
+    async def close(self) -> None:
+        if self.session is not None and not self.session.closed and self._loop is asyncio.get_running_loop():
+            await self.session.close()
+        self.session, self._loop = None, None
+
+    def _connector(self) -> aiohttp.TCPConnector:
+        try:
+            resolver = aiohttp.AsyncResolver()  # aiodns
+        except RuntimeError:
+            resolver = None
+        return aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+            resolver=resolver,
+        )
+
+    async def _post(self, url: str, body: bytes, ids: list[_types.CallID]) -> Any:
+        session = await self.open()
+        async with session.post(url=url, data=body) as r:
+            return json.loads(await r.read())
+
+    def _split(self, payload: dict[_types.CallID, Call]) -> Iterator[tuple[list[_types.CallID], bytes]]:
+        """
+        Packs serialized calls into JSON arrays of at most `max_calls` calls and `max_bytes` bytes.
+        A single call larger than `max_bytes` is still sent, alone.
+        :return: Yields call ids and body of every chunk.
+        """
+        ids, parts, size = [], [], 2
+        for id, call in payload.items():
+            part = call.dumpb()
+            if parts and (
+                    (self.max_calls and len(parts) >= self.max_calls) or
+                    (self.max_bytes and size + len(part) + 1 > self.max_bytes)
+            ):
+                yield ids, b'[' + b','.join(parts) + b']'
+                ids, parts, size = [], [], 2
+            ids.append(id)
+            parts.append(part)
+            size += len(part) + 1
+        if parts:
+            yield ids, b'[' + b','.join(parts) + b']'
+
+    @staticmethod
+    def _failed(ids: list[_types.CallID], error: dict[str, Any]) -> list[dict[str, Any]]:
+        return [{'jsonrpc': '2.0', 'id': id, 'error': error} for id in ids]
+
+    @staticmethod
+    def _retryable(response: dict[str, Any]) -> bool:
+        return 'error' in response and response['error'].get('code') not in _errors.FATAL
+
+    @staticmethod
+    def _decode(
+            payload: dict[_types.CallID, Call],
+            responses: dict[_types.CallID, dict[str, Any]],
+    ) -> dict[_types.CallID, _types.Result]:
+        """
+        Decodes results grouped by decoder, so each group goes through the batch decoder at once.
+        `null` results are not decoded, error objects and decoding failures become `RpcError`s.
+        """
+        groups, results = {}, {}
+        for id, response in responses.items():
+            if 'error' in response:
+                error = response['error']
+                results[id] = _types.Result(error=_errors.RpcError(error.get('code'), error.get('message'), error.get('data')))
+            elif response['result'] is None:
+                results[id] = _types.Result()
+            else:
+                groups.setdefault(payload[id].decoder, []).append(id)
+        for decoder, ids in groups.items():
+            try:
+                results.update(zip(ids, map(_types.Result, decoders.batch(decoder, [responses[id]['result'] for id in ids]))))
+            except Exception:  # noqa, find out which results can't be decoded
+                for id in ids:
+                    try:
+                        results[id] = _types.Result(decoder(responses[id]['result']))
+                    except Exception as e:
+                        results[id] = _types.Result(error=_errors.RpcError(None, f'Undecodable result: {e!r}'))
+        return results
+
+    async def _send(
+            self,
+            payload: dict[_types.CallID, Call],
+            url: str,
+            multicall: bool = True,
+    ) -> dict[_types.CallID, dict[str, Any]]:
+        """
+        Sends the payload, packed into Multicall3 calls if enabled and split into concurrent chunks.
+        A failed chunk or a missing response turns into error objects of the affected calls.
+        :param multicall: `False` to send the calls as they are, even if `multicall` is enabled.
+        :return: Raw responses of every call by call id.
+        """
+        semaphore, calls, routes = asyncio.Semaphore(self.concurrency), payload, {}
+        if self.multicall and multicall:
+            calls, routes = _multicall.aggregate(payload, size=self.multicall, address=self.multicall_address)
+
+        async def send(ids: list[_types.CallID], body: bytes) -> list[dict[str, Any]]:
+            async with semaphore:
+                try:
+                    responses = await self._post(url=url, body=body, ids=ids)
+                except Exception as e:
+                    return self._failed(ids, {'code': None, 'message': repr(e)})
+                if isinstance(responses, dict):  # the whole batch was rejected
+                    return self._failed(ids, responses.get('error') or {'code': None, 'message': 'Malformed response'})
+                return responses
+
+        responses = {
+            response.get('id'): response
+            for chunk in await asyncio.gather(*(send(ids, body) for ids, body in self._split(calls)))
+            for response in chunk
+        }
+        responses = {id: responses.get(id) or self._failed([id], _NO_RESPONSE)[0] for id in calls}
+        return _multicall.unpack(responses, routes) if routes else responses
+
+    async def _lookup(
+            self,
+            payload: dict[_types.CallID, Call],
+    ) -> tuple[dict[_types.CallID, dict[str, Any]], dict[_types.CallID, str]]:
+        """
+        :return: Cached responses by call id and cache keys of the cacheable calls.
+        """
+        if self.cache is None:
+            return {}, {}
+        keys = {id: key for id, call in payload.items() if (key := _cache.key(call)) is not None}
+        hits = await self.cache.get(set(keys.values()))
+        return {id: {'id': id, 'result': hits[key]} for id, key in keys.items() if key in hits}, keys
+
+    async def _store(
+            self,
+            payload: dict[_types.CallID, Call],
+            keys: dict[_types.CallID, str],
+            responses: dict[_types.CallID, dict[str, Any]],
+    ) -> None:
+        if keys:
+            await self.cache.set({
+                keys[id]: response['result']
+                for id, response in responses.items()
+                if id in keys and _cache.final(payload[id], response.get('result'))
+            })
+
+    async def _retry(
+            self,
+            payload: dict[_types.CallID, Call],
+            url: str,
+            keys: dict[_types.CallID, str],
+            multicall: bool = True,
+    ) -> dict[_types.CallID, dict[str, Any]]:
+        """
+        Sends the payload, resending only failed (not deterministically) or unanswered calls,
+        up to `retries` times with exponential `backoff`. Only the first attempt is aggregated,
+        so calls of a failed or malformed `aggregate3` are resent alone.
+        :return: Raw responses of every call by call id.
+        """
+        responses, pending = {}, payload
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            fetched = await self._send(pending, url=url, multicall=multicall and not attempt)
+            await self._store(payload, keys, fetched)
+            responses |= fetched
+            if not (pending := {id: payload[id] for id, response in fetched.items() if self._retryable(response)}):
+                break
+        return responses
+
+    async def results(
+            self,
+            payload: Calls,
+            url: Optional[str] = None,
+    ) -> dict[_types.CallID, _types.Result]:
+        """
+        Sends the payload, resending only failed (not deterministically) or unanswered calls,
+        up to `retries` times with exponential `backoff`.
+        :return: Success or error of every call by call id, in payload order.
+        """
+        payload = Batch.of(payload)
+        responses, keys = await self._lookup(payload)
+        pending = {id: call for id, call in payload.items() if id not in responses}
+        responses |= await self._retry(pending, url=url or self.url, keys=keys)
+        results = self._decode(payload, responses)
+        return {id: results[id] for id in payload}
+
+    async def request(
+            self,
+            payload: Calls,
+            url: Optional[str] = None,
+    ) -> tuple[_types.DecodedResponse, ...]:
+        """
+        :return: Decoded results in payload order.
+        :raise BatchError: Some calls failed, partial results are kept in the exception.
+        """
+        results = await self.results(Batch.of(payload), url=url)
+        if any(not result.ok for result in results.values()):
+            raise _errors.BatchError(results)
+        return tuple(result.value for result in results.values())
+
+    async def _post_stream(
+            self,
+            url: str,
+            body: bytes,
+            ids: list[_types.CallID],
+    ) -> AsyncGenerator[dict[str, Any], None]:
+        session = await self.open()
+        parser = _stream.ArrayParser()
+        async with session.post(url=url, data=body) as r:
+            async for chunk in r.content.iter_any():
+                for response in parser.feed(chunk):
+                    yield response
+        for response in parser.close():
+            yield response
+
+    async def stream(
+            self,
+            payload: Calls,
+            url: Optional[str] = None,
+    ) -> AsyncGenerator[tuple[_types.CallID, _types.DecodedResponse], None]:
+        """
+        Like `request`, but parses response bodies incrementally and yields results as soon as they arrive,
+        cache hits first, then in arrival order. Failed calls are resent alone at the end.
+        :return: Yields (call id, decoded result) pairs.
+        :raise BatchError: Some calls failed, the exception holds their errors only.
+        """
+        payload = Batch.of(payload)
+
+        def decode(response: dict[str, Any]) -> _types.DecodedResponse:
+            result = response['result']
+            return None if result is None else payload[response['id']].decoder(result)
+
+        responses, keys = await self._lookup(payload)
+        for id, response in responses.items():
+            yield id, decode(response)
+        if not (pending := {id: call for id, call in payload.items() if id not in responses}):
+            return
+
+        url, semaphore, calls, routes = url or self.url, asyncio.Semaphore(self.concurrency), pending, {}
+        if self.multicall:
+            calls, routes = _multicall.aggregate(pending, size=self.multicall, address=self.multicall_address)
+        queue = asyncio.Queue()
+
+        async def send(ids: list[_types.CallID], body: bytes) -> None:
+            async with semaphore:
+                try:
+                    async for response in self._post_stream(url=url, body=body, ids=ids):
+                        queue.put_nowait(response)
+                except Exception:  # noqa, unanswered calls are resent below
+                    return
+
+        done = asyncio.gather(*(send(ids, body) for ids, body in self._split(calls)))
+        done.add_done_callback(lambda _: queue.put_nowait(None))
+        fetched, failed, undecodable = {}, {}, {}
+        try:
+            while (response := await queue.get()) is not None:
+                if response.get('id') in routes:
+                    unpacked = _multicall.unpack({response['id']: response}, {response['id']: routes[response['id']]})
+                else:
+                    unpacked = {response.get('id'): response}
+                for id, item in unpacked.items():
+                    if id not in pending:
+                        continue
+                    elif 'error' in item:
+                        failed[id] = item
+                        continue
+                    try:
+                        value = decode(item)
+                    except Exception as e:
+                        undecodable[id] = _types.Result(error=_errors.RpcError(None, f'Undecodable result: {e!r}'))
+                        continue
+                    fetched[id] = item
+                    yield id, value
+        finally:
+            done.cancel()
+        await self._store(payload, keys, fetched)
+
+        missing = {
+            id: failed.get(id) or self._failed([id], _NO_RESPONSE)[0]
+            for id in pending if id not in fetched and id not in undecodable
+        }
+        errors = self._decode(payload, missing) | undecodable
+        if self.retries and (retry := {id: pending[id] for id, response in missing.items() if self._retryable(response)}):
+            retried = await self._retry(retry, url=url, keys=keys, multicall=False)
+            for id, result in self._decode(payload, retried).items():
+                if result.ok:
+                    del errors[id]
+                    yield id, result.value
+                else:
+                    errors[id] = result
+        if errors:
+            raise _errors.BatchError(errors)
@@ -0,0 +1,39 @@
+from typing import Optional, Any
+
+from . import _types
+
+
+FATAL = {  # deterministic failures, resending the call can't help
+    3,  # execution reverted
+    -32700,  # parse error
+    -32600,  # invalid request
+    -32601,  # method not found
+    -32602,  # invalid params
+}
+
+
+class RpcError(Exception):
+    """
+    JSON-RPC error object of a single call, `code` is `None` for transport failures and missing responses.
+    """
+
+    def __init__(self, code: Optional[int], message: str, data: Any = None):
+        super().__init__(f'[{code}] {message}')
+        self.code: Optional[int] = code
+        self.message: str = message
+        self.data: Any = data
+
+    @property
+    def fatal(self) -> bool:
+        return self.code in FATAL
+
+
+class BatchError(Exception):
+    """
+    Raised when some calls of a batch still failed after retries, successful results are kept in `results`.
+    """
+
+    def __init__(self, results: dict[_types.CallID, _types.Result]):
+        self.results: dict[_types.CallID, _types.Result] = results
+        self.errors: dict[_types.CallID, RpcError] = {id: r.error for id, r in results.items() if r.error}
+        super().__init__(f'{len(self.errors)} of {len(results)} calls failed, first: {next(iter(self.errors.values()), None)}')
@@ -0,0 +1,155 @@
+from typing import Any, Optional
+
+from . import _types, _errors, payloads
+from ._batch import Call
+
+
+ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'  # Multicall3, same address on most EVM chains
+AGGREGATE3 = '0x82ad56cb'  # aggregate3((address,bool,bytes)[])
+
+
+def _word(value: int) -> str:
+    return format(value, '064x')
+
+
+def encode(calls: list[tuple[str, _types.HexStr]]) -> _types.HexStr:
+    """
+    ABI-encodes `aggregate3` calldata, every call is sent with `allowFailure=true`.
+    :param calls: (target, calldata) pairs.
+    :return: Calldata hex string.
+    """
+    head, tail, offset = [], [], 32 * len(calls)
+    for target, data in calls:
+        data = data[2:]
+        padded = data + '0' * (-len(data) % 64)
+        head.append(_word(offset))
+        tail.append(target[2:].lower().rjust(64, '0') + _word(1) + _word(96) + _word(len(data) // 2) + padded)
+        offset += 128 + len(padded) // 2
+    return _types.HexStr(AGGREGATE3 + _word(32) + _word(len(calls)) + ''.join(head) + ''.join(tail))
+
+
+def decode(hex: _types.HexStr) -> list[tuple[bool, _types.HexStr]]:  # noqa
+    """
+    Decodes `aggregate3` return data.
+    :param hex: Raw `eth_call` result.
+    :return: (success, returnData) pairs in call order.
+    """
+    data = hex[2:]
+    base = int(data[:64], 16) * 2 + 64
+    results = []
+    for i in range(int(data[base - 64: base], 16)):
+        tuple_at = base + int(data[base + i * 64: base + (i + 1) * 64], 16) * 2
+        bytes_at = tuple_at + int(data[tuple_at + 64: tuple_at + 128], 16) * 2
+        length = int(data[bytes_at: bytes_at + 64], 16) * 2
+        results.append((
+            int(data[tuple_at: tuple_at + 64], 16) != 0,
+            _types.HexStr('0x' + data[bytes_at + 64: bytes_at + 64 + length]),
+        ))
+    return results
+
+
+@payloads.payload
+def aggregate3(
+        calls: list[tuple[str, _types.HexStr]],
+        identifier: int | str = 'latest',
+        address: str = ADDRESS,
+) -> _types.CallData:
+    return _types.CallData(
+        method='eth_call',
+        decoder=decode,
+        params=[
+            {
+                'to': address,
+                'data': encode(calls),
+            },
+            identifier,
+        ],
+    )
+
+
+def _block(call: Call) -> Optional[int | str]:
+    """
+    :return: Block identifier of a plain `eth_call` (only `to` and `data` set), `None` if it can't be aggregated.
+    """
+    if call.method != 'eth_call':
+        return None
+    params = call.params
+    if not isinstance(params[0], dict) or params[0].keys() != {'to', 'data'}:
+        return None
+    identifier = params[1] if len(params) > 1 else 'latest'
+    return identifier if isinstance(identifier, (int, str)) else None
+
+
+def aggregate(
+        payload: dict[_types.CallID, Call],
+        size: int = 500,
+        address: str = ADDRESS,
+) -> tuple[dict[_types.CallID, Call], dict[_types.CallID, list[_types.CallID]]]:
+    """
+    Packs `eth_call`s targeting the same block into `aggregate3` calls of at most `size` calls each.
+    :param payload: Calls by id.
+    :param size: Max calls per `aggregate3`.
+    :param address: Multicall3 deployment.
+    :return: New payload and the packed call ids of every `aggregate3` call id.
+    """
+    packed, groups, routes = {}, {}, {}
+    for id, call in payload.items():
+        identifier = _block(call)
+        if identifier is None:
+            packed[id] = call
+        else:
+            groups.setdefault(identifier, []).append(id)
+    for identifier, ids in groups.items():
+        if len(ids) == 1:
+            packed[ids[0]] = payload[ids[0]]
+            continue
+        for start in range(0, len(ids), size):
+            chunk = ids[start: start + size]
+            call = aggregate3(
+                calls=[(payload[id].params[0]['to'], payload[id].params[0]['data']) for id in chunk],
+                identifier=identifier,
+                address=address,
+            )
+            packed[call.id] = call
+            routes[call.id] = chunk
+    return packed, routes
+
+
+def _error(id: _types.CallID, error: dict[str, Any]) -> dict[str, Any]:
+    return {'jsonrpc': '2.0', 'id': id, 'error': error}
+
+
+def unpack(
+        responses: dict[_types.CallID, dict[str, Any]],
+        routes: dict[_types.CallID, list[_types.CallID]],
+) -> dict[_types.CallID, dict[str, Any]]:
+    """
+    Replaces every `aggregate3` response by the responses of the calls it packed, as if they were sent alone.
+    A reverted call gets an 'execution reverted' error object, a call returning no data a `null` result.
+    An `aggregate3` that failed as a whole or returned malformed data (e.g. `0x` where Multicall3 isn't
+    deployed, or a result of the wrong length) gives every packed call a retryable error, to resend it alone.
+    """
+    unpacked = {id: response for id, response in responses.items() if id not in routes}
+    for aggregate_id, ids in routes.items():
+        if (response := responses.get(aggregate_id)) is None:
+            continue
+        if 'error' in response:
+            error = response['error']
+            if error.get('code') in _errors.FATAL:  # of the aggregate, not necessarily of the packed calls
+                error = {'code': None, 'message': f'aggregate3 failed: {error.get("message")}', 'data': error}
+            unpacked |= {id: _error(id, error) for id in ids}
+            continue
+        try:
+            results = decode(response['result'])
+            if len(results) != len(ids):
+                raise ValueError(f'{len(results)} results for {len(ids)} calls')
+        except (ValueError, TypeError) as e:
+            error = {'code': None, 'message': f'Malformed aggregate3 result: {e}', 'data': response['result']}
+            unpacked |= {id: _error(id, error) for id in ids}
+            continue
+        for id, (success, data) in zip(ids, results):
+            if success:
+                unpacked[id] = {'jsonrpc': '2.0', 'id': id, 'result': data if len(data) > 2 else None}
+            else:
+                unpacked[id] = {'jsonrpc': '2.0', 'id': id, 'error': {'code': 3, 'message': 'execution reverted', 'data': data}}
+    return unpacked
@@ -1,26 +1,25 @@
-from typing import Any
-import aiohttp
+from typing import Optional
 
 from . import _types
-from .. import json
+from ._client import JsonRpcClient
+from ._batch import Calls
+
+
+_client: Optional[JsonRpcClient] = None
+
+
+def client() -> JsonRpcClient:
+    """
+    :return: Module-level `JsonRpcClient` shared by every `request` call.
+    """
+    global _client
+    if _client is None:
+        _client = JsonRpcClient()
+    return _client
 
 
 async def request(
         url: str,
-        payload: dict[str, dict[str, Any]],
+        payload: Calls,
 ) -> tuple[_types.DecodedResponse, ...]:
-    async with aiohttp.ClientSession(
-            json_serialize=json.dumps,
-    ) as s:
-        async with s.post(
-                url=url,
-                headers={
-                    'accept': 'application/json',
-                    'Content-Type': 'application/json',
-                },
-                data=json.dumps([value['payload'] for value in payload.values()]),
-        ) as r:
-            return tuple(
-                payload[response['id']]['decoder'](response['result'])
-                for response in await r.json()
-            )
+    return await client().request(payload, url=url)
@@ -0,0 +1,167 @@
+from typing import Optional, Any, AsyncGenerator
+from collections import deque
+import asyncio
+import random
+import time
+
+from . import _types
+from ._client import JsonRpcClient
+from .. import json
+
+
+class Endpoint:
+    """
+    Health of one node: EWMA of latency and error rate, recent latencies for the hedging delay.
+    """
+    __slots__ = ('url', 'latency', 'errors', 'latencies', 'inflight', 'failures', 'ejected_until')
+
+    def __init__(self, url: str, latency: float = 0.5):
+        self.url: str = url
+        self.latency: float = latency
+        self.errors: float = 0.0
+        self.latencies: deque[float] = deque(maxlen=128)
+        self.inflight: int = 0
+        self.failures: int = 0  # consecutive
+        self.ejected_until: float = float('-inf')
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.url!r}, latency={self.latency:.3f}, errors={self.errors:.2f})'
+
+    @property
+    def score(self) -> float:
+        """
+        Lower is better, expected wait of one more batch penalized by the error rate.
+        """
+        return self.latency * (self.inflight + 1) * (1 + 10 * self.errors)
+
+    def p95(self, default: float) -> float:
+        if len(self.latencies) < 20:
+            return default
+        return sorted(self.latencies)[int(len(self.latencies) * 0.95)]
+
+
+class JsonRpcRouter(JsonRpcClient):
+    """
+    `JsonRpcClient` over several endpoints of the same chain. Every chunk goes to the better of two random
+    healthy endpoints (scored by latency/error EWMA and in-flight chunks); when it isn't answered within the
+    endpoint's p95 latency, a hedged duplicate goes to another endpoint and the first answer wins.
+    An endpoint failing `eject_after` times in a row is ejected for `eject_sec`, doubled on every new ejection.
+    """
+
+    def __init__(
+            self,
+            urls: list[str],
+            alpha: float = 0.2,
+            hedge: bool = True,
+            hedge_delay: float = 1.0,
+            eject_after: int = 3,
+            eject_sec: float = 10,
+            **kwargs: Any,
+    ):
+        super().__init__(url=urls[0], **kwargs)
+        self.endpoints: list[Endpoint] = [Endpoint(url, latency=hedge_delay) for url in urls]
+        self.alpha: float = alpha
+        self.hedge: bool = hedge
+        self.hedge_delay: float = hedge_delay
+        self.eject_after: int = eject_after
+        self.eject_sec: float = eject_sec
+
+    def healthy(self) -> list[Endpoint]:
+        """
+        :return: Endpoints that are not ejected, or the one released first if all of them are.
+        """
+        now = time.monotonic()
+        return [e for e in self.endpoints if e.ejected_until <= now] or \
+            [min(self.endpoints, key=lambda e: e.ejected_until)]
+
+    def pick(self, exclude: tuple[Endpoint, ...] = ()) -> Optional[Endpoint]:
+        candidates = [e for e in self.healthy() if e not in exclude]
+        if not candidates:
+            return None
+        return min(random.sample(candidates, min(2, len(candidates))), key=lambda e: e.score)
+
+    def _record(self, endpoint: Endpoint, latency: Optional[float]) -> None:
+        """
+        :param latency: Seconds until answered, `None` for a failure.
+        """
+        a = self.alpha
+        endpoint.errors = (1 - a) * endpoint.errors + a * (latency is None)
+        if latency is None:
+            endpoint.failures += 1
+            if endpoint.failures >= self.eject_after:
+                factor = 2 ** (endpoint.failures - self.eject_after)
+                endpoint.ejected_until = time.monotonic() + self.eject_sec * factor
+            return
+        endpoint.latency = (1 - a) * endpoint.latency + a * latency
+        endpoint.latencies.append(latency)
+        endpoint.failures = 0
+
+    async def _attempt(self, endpoint: Endpoint, body: bytes) -> Any:
+        endpoint.inflight += 1
+        started = time.monotonic()
+        try:
+            session = await self.open()
+            async with session.post(url=endpoint.url, data=body) as r:
+                r.raise_for_status()
+                responses = json.loads(await r.read())
+            if isinstance(responses, dict):  # the whole batch was rejected
+                raise ValueError(responses.get('error'))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._record(endpoint, None)
+            raise
+        else:
+            self._record(endpoint, time.monotonic() - started)
+            return responses
+        finally:
+            endpoint.inflight -= 1
+
+    async def _post(self, url: str, body: bytes, ids: list[_types.CallID]) -> Any:
+        """
+        `url` is ignored, endpoints are picked per chunk: a new one is tried when the previous
+        attempt failed (failover) or is slower than its p95 (hedging), the first answer wins.
+        """
+        tried, tasks, error = [], set(), None
+        try:
+            while True:
+                if endpoint := self.pick(exclude=tuple(tried)):
+                    tried.append(endpoint)
+                    tasks.add(asyncio.create_task(self._attempt(endpoint, body)))
+                elif not tasks:
+                    raise error
+                hedge = self.hedge and endpoint is not None and any(e not in tried for e in self.healthy())
+                done, tasks = await asyncio.wait(
+                    tasks,
+                    timeout=endpoint.p95(self.hedge_delay) if hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+        finally:  # answered, or cancelled itself (e.g. `stream` exited early): the other attempts lost
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.wait(tasks)  # `inflight` of their endpoints is released
+
+    async def _post_stream(
+            self,
+            url: str,
+            body: bytes,
+            ids: list[_types.CallID],
+    ) -> AsyncGenerator[dict[str, Any], None]:
+        endpoint = self.pick()
+        endpoint.inflight += 1
+        started = time.monotonic()
+        try:
+            async for response in super()._post_stream(url=endpoint.url, body=body, ids=ids):
+                yield response
+        except Exception:
+            self._record(endpoint, None)
+            raise
+        else:
+            self._record(endpoint, time.monotonic() - started)
+        finally:
+            endpoint.inflight -= 1
@@ -0,0 +1,69 @@
+from typing import Any
+import re
+
+from .. import json
+
+
+_STRUCTURAL = re.compile(rb'["\\\[\]{}]')
+
+
+class ArrayParser:
+    """
+    Incremental parser of a JSON array of objects: fed with body chunks, returns every element once complete.
+    Only structural bytes are inspected in Python, elements themselves are parsed by `json.loads`.
+    A body that is not an array (e.g. a single error object) is returned as one element on `close`.
+    """
+
+    def __init__(self):
+        self.buffer: bytearray = bytearray()
+        self.scanned: int = 0  # buffer position the scan resumes from
+        self.skip: int = 0  # position of the next byte not escaped by a backslash
+        self.depth: int = 0
+        self.string: bool = False
+        self.start: int = -1  # position of the element being parsed
+        self.array: bool | None = None
+
+    def feed(self, chunk: bytes) -> list[Any]:
+        self.buffer += chunk
+        if self.array is None and (stripped := self.buffer.lstrip()):
+            self.array = stripped[:1] == b'['
+        if not self.array:
+            return []
+
+        elements, consumed = [], 0
+        for match in _STRUCTURAL.finditer(self.buffer, self.scanned):
+            at = match.start()
+            if at < self.skip:
+                continue
+            char = self.buffer[at]
+            if char == 0x5c:  # \
+                self.skip = at + 2
+            elif char == 0x22:  # "
+                self.string = not self.string
+            elif self.string:
+                continue
+            elif char in b'[{':
+                self.depth += 1
+                if self.depth == 2:
+                    self.start = at
+            else:
+                self.depth -= 1
+                if self.depth == 1:
+                    elements.append(json.loads(self.buffer[self.start: at + 1]))
+                    consumed, self.start = at + 1, -1
+        self.scanned = len(self.buffer)
+
+        if consumed:
+            del self.buffer[:consumed]
+            self.scanned -= consumed
+            self.skip = max(self.skip - consumed, 0)
+            self.start = self.start - consumed if self.start >= 0 else -1
+        return elements
+
+    def close(self) -> list[Any]:
+        """
+        :return: Remaining elements, nothing for an array body.
+        """
+        if self.array is False:
+            return [json.loads(self.buffer)]
+        return []
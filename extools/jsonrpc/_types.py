@@ -1,10 +1,10 @@
-from typing import Callable, Any, NewType, TypedDict
+from typing import Callable, Any, NewType, TypedDict, NamedTuple, Optional
 
 
 HexStr = NewType("HexStr", str)
 
 CallMethod = str
-CallID = str
+CallID = int
 DecodedResponse = Any
 Decoder = Callable[[HexStr], DecodedResponse]
 CallParams = list[Any]
@@ -15,3 +15,12 @@ CallData = TypedDict('CallData', {
     'params': CallParams,
     'method': CallMethod,
 })
+
+
+class Result(NamedTuple):
+    value: DecodedResponse = None
+    error: Optional[Exception] = None  # `RpcError`
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
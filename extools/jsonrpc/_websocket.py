@@ -0,0 +1,210 @@
+from typing import Optional, Any, AsyncGenerator
+from contextlib import suppress
+import asyncio
+import aiohttp
+
+from . import _types, _errors
+from ._client import JsonRpcClient
+from ._batch import Call
+from .. import json
+
+
+_CLOSED = object()  # ends the generators of subscriptions
+
+
+class Subscription:
+    __slots__ = ('params', 'id', 'queue')
+
+    def __init__(self, params: list[Any]):
+        self.params: list[Any] = params
+        self.id: Optional[str] = None  # changes on every resubscribe
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+
+class JsonRpcWebSocket(JsonRpcClient):
+    """
+    `JsonRpcClient` over one WebSocket: batches are multiplexed over the socket and matched by call id,
+    `eth_subscribe` notifications are delivered by `subscribe` as async generators. The socket reconnects
+    with exponential backoff, calls in flight fail (and are retried by `results`), subscriptions are renewed.
+    """
+
+    def __init__(
+            self,
+            url: str,
+            heartbeat: Optional[float] = 30,
+            reconnect_delay: float = 0.5,
+            max_reconnect_delay: float = 30,
+            **kwargs: Any,
+    ):
+        super().__init__(url=url, **kwargs)
+        self.heartbeat: Optional[float] = heartbeat
+        self.reconnect_delay: float = reconnect_delay
+        self.max_reconnect_delay: float = max_reconnect_delay
+        self.ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._resubscriber: Optional[asyncio.Task] = None
+        self._connected: Optional[asyncio.Event] = None
+        self._pending: dict[_types.CallID, tuple[asyncio.Future, list[_types.CallID]]] = {}
+        self._subscribing: dict[_types.CallID, Subscription] = {}
+        self._subscriptions: dict[str, Subscription] = {}
+        self._active: list[Subscription] = []
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def connect(self) -> None:
+        if self._reader is not None and not self._reader.done():
+            return
+        session = await self.open()
+        if self.ws is not None:
+            await self.ws.close()
+        self._connected = asyncio.Event()
+        self.ws = await session.ws_connect(self.url, heartbeat=self.heartbeat, max_msg_size=0)
+        self._connected.set()
+        self._reader = asyncio.create_task(self._read())
+        if self._active:  # the previous reader stopped
+            self._subscriptions.clear()
+            self._resubscriber = asyncio.create_task(self._resubscribe())
+
+    async def close(self) -> None:
+        for task in (self._reader, self._resubscriber):
+            if task is not None:
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+        if self.ws is not None:
+            await self.ws.close()
+        self._fail(ConnectionError('WebSocket closed'))
+        for subscription in self._active:
+            subscription.queue.put_nowait(_CLOSED)
+        self._subscriptions.clear()
+        self._reader, self._resubscriber, self.ws, self._active = None, None, None, []
+        await super().close()
+
+    def _fail(self, error: Exception) -> None:
+        for future, _ in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+        self._subscribing.clear()
+
+    def _dispatch(self, message: Any) -> None:
+        if isinstance(message, list):
+            found = next((self._pending[r.get('id')] for r in message if r.get('id') in self._pending), None)
+            if found is not None:
+                future, ids = found
+                for id in ids:
+                    self._pending.pop(id, None)
+                if not future.done():
+                    future.set_result(message)
+        elif message.get('method') == 'eth_subscription':
+            params = message['params']
+            if subscription := self._subscriptions.get(params['subscription']):
+                subscription.queue.put_nowait(params['result'])
+        elif (id := message.get('id')) in self._pending:
+            if (subscription := self._subscribing.pop(id, None)) and 'result' in message:
+                # registered before any notification of the new subscription is read
+                subscription.id = message['result']
+                self._subscriptions[subscription.id] = subscription
+            future, _ = self._pending.pop(id)
+            if not future.done():
+                future.set_result(message)
+
+    async def _read(self) -> None:
+        delay = self.reconnect_delay
+        while True:
+            with suppress(Exception):  # reconnects whatever the failure
+                async for message in self.ws:
+                    if message.type in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                        # not JSON, or not shaped like a response or notification
+                        with suppress(ValueError, LookupError, TypeError, AttributeError):
+                            self._dispatch(json.loads(message.data))
+                    elif message.type == aiohttp.WSMsgType.ERROR:
+                        break
+            self._connected.clear()
+            self._fail(ConnectionError('WebSocket disconnected'))
+            self._subscriptions.clear()
+            with suppress(Exception):
+                await self.ws.close()
+            while True:
+                await asyncio.sleep(delay)
+                try:
+                    self.ws = await (await self.open()).ws_connect(self.url, heartbeat=self.heartbeat, max_msg_size=0)
+                except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+                    delay = min(delay * 2, self.max_reconnect_delay)
+                else:
+                    delay = self.reconnect_delay
+                    break
+            self._connected.set()
+            self._resubscriber = asyncio.create_task(self._resubscribe())
+
+    async def _resubscribe(self) -> None:
+        """
+        Renews active subscriptions after a reconnect, failures are retried on the next one.
+        """
+        await asyncio.gather(*(self._subscribe(subscription) for subscription in self._active), return_exceptions=True)
+
+    async def _exchange(self, ids: list[_types.CallID], body: bytes) -> Any:
+        if self._reader is None or self._reader.done():
+            await self.connect()
+        await asyncio.wait_for(self._connected.wait(), timeout=self.timeout)
+        future = asyncio.get_running_loop().create_future()
+        for id in ids:
+            self._pending[id] = (future, ids)
+        try:
+            await self.ws.send_bytes(body)
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        finally:
+            for id in ids:
+                self._pending.pop(id, None)
+
+    async def _post(self, url: str, body: bytes, ids: list[_types.CallID]) -> Any:
+        return await self._exchange(ids, body)
+
+    async def _post_stream(
+            self,
+            url: str,
+            body: bytes,
+            ids: list[_types.CallID],
+    ) -> AsyncGenerator[dict[str, Any], None]:
+        for response in await self._exchange(ids, body):
+            yield response
+
+    async def _subscribe(self, subscription: Subscription) -> None:
+        call = Call(method='eth_subscribe', params=subscription.params, decoder=lambda _: _)
+        self._subscribing[call.id] = subscription
+        response = await self._exchange([call.id], call.dumpb())
+        if 'error' in response:
+            error = response['error']
+            raise _errors.RpcError(error.get('code'), error.get('message'), error.get('data'))
+
+    async def subscribe(self, *params: Any) -> AsyncGenerator[Any, None]:
+        """
+        Usage: `async for head in ws.subscribe('newHeads'): ...`
+        :param params: `eth_subscribe` params, e.g. 'logs', {'address': ..., 'topics': [...]}.
+        :return: Yields notifications, across reconnects, until the generator or the client is closed.
+        """
+        subscription = Subscription(params=list(params))
+        await self._subscribe(subscription)
+        self._active.append(subscription)
+        try:
+            while (notification := await subscription.queue.get()) is not _CLOSED:
+                yield notification
+        finally:
+            if subscription in self._active:
+                self._active.remove(subscription)
+            id = subscription.id
+            if self._subscriptions.pop(id, None) is not None and self.ws is not None and not self.ws.closed:
+                call = Call(method='eth_unsubscribe', params=[id], decoder=lambda _: _)
+                with suppress(Exception):
+                    await self._exchange([call.id], call.dumpb())
+
+    def heads(self) -> AsyncGenerator[dict[str, Any], None]:
+        return self.subscribe('newHeads')
+
+    def logs(self, **params: Any) -> AsyncGenerator[dict[str, Any], None]:
+        """
+        :param params: Filter, same keys as `payloads.filter` except block range.
+        """
+        return self.subscribe('logs', params)
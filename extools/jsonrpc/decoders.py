@@ -1,3 +1,5 @@
+from typing import Iterable, Callable, Any
+
 from .. import utils
 from . import _types
 
@@ -21,3 +23,49 @@ def to_addr(
         hex: _types.HexStr,  # noqa
 ) -> str:
     return str(utils.to_checksum_address(hex[:2] + hex[26:]))
+
+
+def to_int_pair(
+        hex: _types.HexStr,  # noqa
+) -> tuple[int, int]:
+    return int(hex[2:66], 16), int(hex[66:130], 16)
+
+
+def to_ints(
+        hexes: Iterable[_types.HexStr],
+) -> list[int]:
+    return [int(hex, 16) for hex in hexes]
+
+
+def to_addrs(
+        hexes: Iterable[_types.HexStr],
+) -> list[str]:
+    return utils.to_checksum_addresses('0x' + hex[26:] for hex in hexes)
+
+
+def to_int_pairs(
+        hexes: Iterable[_types.HexStr],
+) -> list[tuple[int, int]]:
+    return [(int(hex[2:66], 16), int(hex[66:130], 16)) for hex in hexes]
+
+
+_batched: dict[_types.Decoder, Callable[[Iterable[_types.HexStr]], list[Any]]] = {
+    to_int: to_ints,
+    to_addr: to_addrs,
+    to_int_pair: to_int_pairs,
+}
+
+
+def batch(
+        decoder: _types.Decoder,
+        hexes: Iterable[_types.HexStr],
+) -> list[_types.DecodedResponse]:
+    """
+    Decodes many results of the same decoder at once, in order.
+    :param decoder: Per-result decoder, e.g. `to_int`.
+    :param hexes: Raw results.
+    :return: Decoded results.
+    """
+    if batched := _batched.get(decoder):
+        return batched(hexes)
+    return [decoder(hex) for hex in hexes]
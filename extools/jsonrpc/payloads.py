@@ -1,29 +1,69 @@
 from typing import Callable, TypedDict, Any
-import uuid
-import web3
 
-from . import decoders, _types
+from . import decoders, selectors, _types
+from ._batch import Call
 from .. import utils
 
 
 def payload(
         call_data: Callable[..., _types.CallData]
-) -> Callable[..., dict[str: dict[str, Any]]]:
-    def wrapper(*args, **kwargs) -> dict[str: dict[str, Any]]:
-        id, data = str(uuid.uuid4()), call_data(*args, **kwargs)
-        return {id: {
-            'payload': {
-                'jsonrpc': '2.0',
-                'id': id,
-                'method': data['method'],
-                'params': data['params'],
-            },
-            'decoder': data['decoder']
-        }}
+) -> Callable[..., Call]:
+    def wrapper(*args, **kwargs) -> Call:
+        data = call_data(*args, **kwargs)
+        return Call(method=data['method'], params=data['params'], decoder=data['decoder'])
 
     return wrapper
 
 
+def _static(type: str) -> bool:
+    return type in {'address', 'bool', 'bytes32'} or type.lstrip('u').rstrip('0123456789') == 'int'
+
+
+def _encode(type: str, value: Any) -> str:
+    if type == 'address':
+        return value[2:].lower().rjust(64, '0')
+    if type == 'bool':
+        return format(int(bool(value)), '064x')
+    if type.startswith('uint'):
+        return format(value, '064x')
+    if type.startswith('int'):
+        return format(value % (1 << 256), '064x')
+    return (value[2:] if isinstance(value, str) else value.hex()).ljust(64, '0')  # bytes32
+
+
+def eth_call(signature: str, decoder: _types.Decoder) -> Callable[..., Call]:
+    """
+    Declares an `eth_call` payload from an ABI signature, the selector is computed once here.
+    Usage: `allowance = eth_call('allowance(address,address)', decoders.to_int)`,
+    then `allowance(contract, owner, spender, identifier='latest')`.
+    :param signature: Canonical ABI function signature with static single-word argument types only.
+    :param decoder: Decoder applied to the call result.
+    :return: Payload builder taking the contract address followed by the ABI arguments.
+    """
+    selector = selectors.selector(signature)
+    types = tuple(type for type in signature[signature.index('(') + 1: -1].split(',') if type)
+    if unsupported := [type for type in types if not _static(type)]:
+        raise ValueError(f'Unsupported ABI types {unsupported}, only static single-word types can be encoded')
+
+    @payload
+    def call(contract: str, *args: Any, identifier: int | str = 'latest') -> _types.CallData:
+        if len(args) != len(types):
+            raise TypeError(f'`{signature}` takes {len(types)} arguments, {len(args)} given')
+        return _types.CallData(
+            method='eth_call',
+            decoder=decoder,
+            params=[
+                {
+                    'to': utils.to_checksum_address(contract),
+                    'data': selector + ''.join(_encode(type, arg) for type, arg in zip(types, args)),
+                },
+                identifier,
+            ]
+        )
+
+    return call
+
+
 @payload
 def token0(pair: str) -> _types.CallData:
     return _types.CallData(
@@ -32,7 +72,7 @@ def token0(pair: str) -> _types.CallData:
         params=[
             {
                 'to': utils.to_checksum_address(pair),
-                'data': web3.Web3.keccak(text='token0()').hex(),
+                'data': selectors.TOKEN0,
             },
             'latest'
         ]
@@ -47,7 +87,7 @@ def token1(pair: str) -> _types.CallData:
         params=[
             {
                 'to': utils.to_checksum_address(pair),
-                'data': web3.Web3.keccak(text='token1()').hex(),
+                'data': selectors.TOKEN1,
             },
             'latest'
         ]
@@ -62,7 +102,7 @@ def symbol(contract: str) -> _types.CallData:
         params=[
             {
                 'to': utils.to_checksum_address(contract),
-                'data': web3.Web3.keccak(text='symbol()').hex(),
+                'data': selectors.SYMBOL,
             },
             'latest'
         ]
@@ -77,7 +117,7 @@ def name(contract: str) -> _types.CallData:
         params=[
             {
                 'to': utils.to_checksum_address(contract),
-                'data': web3.Web3.keccak(text='name()').hex(),
+                'data': selectors.NAME,
             },
             'latest'
         ]
@@ -86,19 +126,13 @@ def name(contract: str) -> _types.CallData:
 
 @payload
 def get_reserves(pair: str) -> _types.CallData:
-    def decoder(reserves):
-        reserves_bytes = bytes.fromhex(reserves[2:])
-        reserves0 = int.from_bytes(reserves_bytes[:32], 'big')
-        reserves1 = int.from_bytes(reserves_bytes[32: 64], 'big')
-        return reserves0, reserves1
-
     return _types.CallData(
         method='eth_call',
-        decoder=decoder,
+        decoder=decoders.to_int_pair,
         params=[
             {
                 'to': utils.to_checksum_address(pair),
-                'data': web3.Web3.keccak(text='getReserves()').hex(),
+                'data': selectors.GET_RESERVES,
             },
             'latest'
         ]
@@ -113,7 +147,7 @@ def decimals(contract: str) -> _types.CallData:
         params=[
             {
                 'to': utils.to_checksum_address(contract),
-                'data': web3.Web3.keccak(text='decimals()').hex(),
+                'data': selectors.DECIMALS,
             },
             'latest'
         ],
@@ -128,7 +162,7 @@ def total_supply(contract: str) -> _types.CallData:
         params=[
             {
                 'to': utils.to_checksum_address(contract),
-                'data': web3.Web3.keccak(text='totalSupply()').hex(),
+                'data': selectors.TOTAL_SUPPLY,
             },
             'latest'
         ]
@@ -143,13 +177,16 @@ def balance_of(contract: str, address: str) -> _types.CallData:
         params=[
             {
                 'to': utils.to_checksum_address(contract),
-                'data': f'0x70a08231000000000000000000000000{utils.to_checksum_address(address)[2:]}',
+                'data': selectors.BALANCE_OF + _encode('address', address),
             },
             'latest'
         ],
     )
 
 
+allowance = eth_call('allowance(address,address)', decoders.to_int)
+
+
 @payload
 def balance(address: str, identifier: int | str = 'latest') -> _types.CallData:
     return _types.CallData(
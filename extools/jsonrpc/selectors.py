@@ -0,0 +1,24 @@
+from functools import cache
+
+from . import _types
+from .. import utils
+
+
+@cache
+def selector(signature: str) -> _types.HexStr:
+    """
+    :param signature: Canonical ABI function signature, e.g. 'balanceOf(address)'.
+    :return: '0x' + 4-byte function selector, hashed once per signature.
+    """
+    return _types.HexStr(utils.keccak256(signature.encode())[:10])
+
+
+TOKEN0 = selector('token0()')
+TOKEN1 = selector('token1()')
+SYMBOL = selector('symbol()')
+NAME = selector('name()')
+GET_RESERVES = selector('getReserves()')
+DECIMALS = selector('decimals()')
+TOTAL_SUPPLY = selector('totalSupply()')
+BALANCE_OF = selector('balanceOf(address)')
+ALLOWANCE = selector('allowance(address,address)')
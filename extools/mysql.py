@@ -1,13 +1,135 @@
-from typing import Optional, Union, Any, AsyncGenerator
-from aiomysql.cursors import DictCursor
+from typing import Optional, Union, Any, AsyncGenerator, AsyncIterator, Iterable, Iterator, Callable
+from aiomysql.cursors import Cursor, DictCursor, SSCursor
+from collections import namedtuple
 from pymysql import err as errors
-from contextlib import suppress
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from weakref import WeakKeyDictionary
+from itertools import chain as _chain, count
+from bisect import bisect_left
+import asyncio
 import aiomysql
+import time
+import re
 
-from . import logman, types
+from . import logman, types, utils
+
+
+_LITERALS = re.compile(r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|\b\d+(?:\.\d+)?\b|%\(\w+\)s|%s""")
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACES = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(query: str) -> str:
+    """
+    :return: Query with literals and placeholders replaced by `?`, lists of them by `(?+)`, whitespace collapsed.
+    """
+    query = _LITERALS.sub('?', query)
+    query = _LISTS.sub('(?+)', query)
+    return _SPACES.sub(' ', query).strip()
+
+
+@lru_cache(maxsize=4096)
+def _preparable(query: str) -> Optional[tuple[str, Optional[tuple[str, ...]]]]:
+    """
+    :return: Query with `?` placeholders and the names of `%(name)s` ones (`None` for `%s`),
+    `None` if it can't be prepared: several statements, a `?` already in it or both kinds of placeholders.
+    """
+    query = query.rstrip().rstrip(';')
+    if '?' in query or ';' in query:
+        return None
+    names = tuple(re.findall(r'%\((\w+)\)s', query))
+    if names and '%s' in query.replace('%%', ''):
+        return None
+    text = re.sub(r'%\(\w+\)s', '?', query) if names else query.replace('%%', '\0').replace('%s', '?')
+    return text.replace('%%', '%').replace('\0', '%'), names or None
+
+
+_UNPREPARED = {  # errors of `SET`/`EXECUTE` meaning the query can't run prepared, not that it failed
+    1210,  # incorrect arguments to EXECUTE
+    1267, 1270, 1271,  # illegal mix of collations: user variables have IMPLICIT coercibility, unlike literals
+    1295,  # not supported by the prepared statement protocol
+}
+
+
+ROW_FACTORIES: dict[str, Callable[[tuple[str, ...]], Callable[[tuple[Any, ...]], Any]]] = {
+    'tuple': lambda columns: tuple,
+    'dict': lambda columns: lambda row: dict(zip(columns, row)),
+    'attrdict': lambda columns: lambda row: types.AttrDict(zip(columns, row)),
+    'lazy': lambda columns: lambda row: types.LazyAttrDict(zip(columns, row)),
+    'record': lambda columns: namedtuple('Record', columns, rename=True)._make,
+}
+
+
+@lru_cache(maxsize=1024)
+def _converter(factory: str, columns: tuple[str, ...]) -> Callable[[tuple[Any, ...]], Any]:
+    """
+    :return: Function making a row of `factory` from a tuple, cached by columns (e.g. the `record` class).
+    """
+    return ROW_FACTORIES[factory](columns)
+
+
+def _columns(cursor: Cursor) -> tuple[str, ...]:
+    """
+    :return: Column names, repeated ones (e.g. of a `JOIN`) prefixed by their table as `DictCursor` does.
+    """
+    columns = []
+    for field in cursor._result.fields if cursor.description else ():
+        columns.append(f'{field.table_name}.{field.name}' if field.name in columns else field.name)
+    return tuple(columns)
+
+
+class Latency:
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(count={self.count}, mean={self.mean * 1000:.2f}ms, max={self.max * 1000:.2f}ms)'
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class Metrics:
+    """
+    Histogram of seconds waited to acquire a connection (counts per bucket of upper bounds `BUCKETS`)
+    and latency of statements by `fingerprint`.
+    """
+    BUCKETS: tuple[float, ...] = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, float('inf'))
+
+    def __init__(self):
+        self.acquire_waits: list[int] = [0] * len(self.BUCKETS)
+        self.queries: dict[str, Latency] = {}
+
+    def acquired(self, seconds: float) -> None:
+        self.acquire_waits[bisect_left(self.BUCKETS, seconds)] += 1
+
+    def executed(self, query: str, seconds: float) -> None:
+        if (latency := self.queries.get(key := fingerprint(query))) is None:
+            latency = self.queries[key] = Latency()
+        latency.add(seconds)
+
+    def histogram(self) -> dict[float, int]:
+        return dict(zip(self.BUCKETS, self.acquire_waits))
 
 
 class MySQL:
+    """
+    Connections are in autocommit mode: every statement is committed by the server, reads don't commit.
+    Use `transaction` for statements to be committed (or rolled back) together on one connection.
+    """
+
     def __init__(
             self,
             database: str,
@@ -15,33 +137,199 @@ class MySQL:
             port: int = 3306,
             user: str = 'root',
             password: Optional[str] = None,
-            logger: Optional[logman.Logger] = logman.logger
+            logger: Optional[logman.Logger] = logman.logger,
+            minsize: int = 1,
+            maxsize: int = 10,
+            recycle: float = -1,
+            connect_timeout: float = 10,
+            row_factory: str = 'attrdict',
+            prepare: bool = False,
+            prepared_per_connection: int = 256,
+            max_statements: int = 4096,
     ):
+        """
+        :param minsize: Connections opened (and checked) by `create_pool` and kept open.
+        :param maxsize: Max connections, acquiring waits when all of them are in use.
+        :param recycle: Seconds after which idle connections are reopened, -1 to never.
+        :param connect_timeout: Seconds to connect.
+        :param row_factory: Rows are returned as 'attrdict' (`types.AttrDict`), 'lazy' (`types.LazyAttrDict`),
+        'dict', 'tuple' or 'record' (namedtuple class generated per set of columns).
+        :param prepare: Experimental, execute queries as server-side prepared statements, see `_execute_prepared`.
+        :param prepared_per_connection: Max statements kept prepared on each connection, least recently used
+        ones are deallocated.
+        :param max_statements: Max queries remembered as prepared (by statement name) or as unpreparable.
+        """
         self.database: str = database
         self.host: str = host
         self.port: int = port
         self.user: str = user
         self.password: str = password
+        self.minsize: int = minsize
+        self.maxsize: int = maxsize
+        self.recycle: float = recycle
+        self.connect_timeout: float = connect_timeout
+        self.row_factory: str = row_factory
+        self.prepare: bool = prepare
+        self.prepared_per_connection: int = prepared_per_connection
+        self.statements: utils.LRUCache = utils.LRUCache(maxsize=max_statements)  # query: id of its statement
+        self.unpreparable: utils.LRUCache = utils.LRUCache(maxsize=max_statements)
+        self._statement_ids: Iterator[int] = count(1)  # never reused, evicted names may still be prepared
+        self._prepared: WeakKeyDictionary[aiomysql.Connection, utils.LRUCache] = WeakKeyDictionary()
         self.pool: Optional[aiomysql.Pool] = None
         self.logger: logman.Logger = logger
+        self.metrics: Metrics = Metrics()
 
     async def create_pool(self) -> bool:
-        with suppress(Exception):
+        try:
             self.pool = await aiomysql.create_pool(
                 db=self.database,
                 host=self.host,
                 port=self.port,
                 user=self.user,
                 password=self.password,
+                minsize=self.minsize,
+                maxsize=self.maxsize,
+                pool_recycle=self.recycle,
+                connect_timeout=self.connect_timeout,
+                autocommit=True,
             )
+            await self._warm_up()
             return True
-        return False
+        except Exception as e:
+            self.logger.exception(e)
+            return False
+
+    async def _warm_up(self) -> None:
+        """
+        Pings `minsize` connections at once, so they are open and authenticated before the first query.
+        """
+        connections = await asyncio.gather(*(self.pool.acquire() for _ in range(self.minsize)))
+        try:
+            await asyncio.gather(*(connection.ping() for connection in connections))
+        finally:
+            for connection in connections:
+                self.pool.release(connection)
 
     async def close_pool(self) -> bool:
-        with suppress(Exception):
+        if self.pool is None:
+            return False
+        try:
             self.pool.close()
+            await self.pool.wait_closed()
             return True
-        return False
+        except Exception as e:
+            self.logger.exception(e)
+            return False
+
+    @property
+    def in_use(self) -> int:
+        return self.pool.size - self.pool.freesize if self.pool else 0
+
+    @property
+    def free(self) -> int:
+        return self.pool.freesize if self.pool else 0
+
+    @asynccontextmanager
+    async def _acquire(self) -> AsyncIterator[aiomysql.Connection]:
+        started = time.perf_counter()
+        async with self.pool.acquire() as connection:
+            self.metrics.acquired(time.perf_counter() - started)
+            yield connection
+
+    def _rows(self, cursor: Cursor) -> Callable[[tuple[Any, ...]], Any]:
+        return _converter(self.row_factory, _columns(cursor))
+
+    async def _execute(self, cursor: aiomysql.Cursor, query: str, args: Any) -> None:
+        started = time.perf_counter()
+        try:
+            if self.prepare and query not in self.unpreparable:
+                await self._execute_prepared(cursor, query, args)
+            else:
+                await cursor.execute(query, self._parse(args))
+        finally:
+            self.metrics.executed(query, time.perf_counter() - started)
+
+    async def _execute_prepared(self, cursor: aiomysql.Cursor, query: str, args: Any) -> None:
+        """
+        Experimental, not measured yet (see `benchmarks/mysql_prepared.py`).
+        PyMySQL doesn't implement the binary protocol (COM_STMT_PREPARE/EXECUTE), statements are prepared with
+        SQL `PREPARE` once per connection and executed as `SET @_p0 = %s, ...; EXECUTE _s1 USING @_p0, ...`
+        in one round trip: arguments are still escaped by the client, parsing the statement is saved.
+        Queries which can't be prepared or executed this way (see `_UNPREPARED`) are executed as they are
+        from then on, arguments not matching the placeholders (e.g. a dict for `%s`) are passed to the query
+        as they are. Other errors are raised, the query isn't run again.
+        """
+        if (parsed := _preparable(query)) is None:
+            return await self._execute_unprepared(cursor, query, args)
+        text, names = parsed
+        if isinstance(args, dict) != bool(names):
+            return await cursor.execute(query, self._parse(args))
+        values = tuple(args[name] for name in names) if names else self._parse(args)
+        connection = cursor.connection
+        if (prepared := self._prepared.get(connection)) is None:
+            prepared = self._prepared[connection] = utils.LRUCache(maxsize=self.prepared_per_connection)
+        if (id := self.statements.get(query)) is None:
+            self.statements.set(query, id := next(self._statement_ids))
+        name = f'_s{id}'
+        if prepared.get(name) is None:
+            if len(prepared) >= prepared.maxsize:
+                evicted, _ = prepared.popitem(last=False)
+                try:
+                    await cursor.execute(f'DEALLOCATE PREPARE {evicted}')
+                except errors.Error as e:
+                    if not e.args or e.args[0] != 1243:
+                        raise
+                    prepared.clear()  # unknown prepared statement: state lost, nothing to deallocate
+            try:
+                await cursor.execute(f'PREPARE {name} FROM {connection.escape(text)}')
+            except errors.Error:  # e.g. not supported by the prepared statement protocol
+                return await self._execute_unprepared(cursor, query, args)
+            prepared.set(name, True)
+        try:
+            if not values:
+                return await cursor.execute(f'EXECUTE {name}')
+            variables = ', '.join(f'@_p{i}' for i in range(len(values)))
+            assignments = ', '.join(f'@_p{i} = %s' for i in range(len(values)))
+            await cursor.execute(f'SET {assignments}; EXECUTE {name} USING {variables}', values)
+            await cursor.nextset()  # result of `EXECUTE`
+        except errors.Error as e:
+            if e.args and e.args[0] == 1243 and prepared:  # unknown prepared statement: state lost, prepare again
+                prepared.clear()
+                return await self._execute_prepared(cursor, query, args)
+            if e.args and e.args[0] in _UNPREPARED:
+                return await self._execute_unprepared(cursor, query, args)
+            raise  # e.g. a duplicate key or a deadlock, running it again wouldn't help
+
+    async def _execute_unprepared(self, cursor: aiomysql.Cursor, query: str, args: Any) -> None:
+        self.unpreparable.set(query, True)
+        await cursor.execute(query, self._parse(args))
+
+    async def _rollback(self, connection: aiomysql.Connection) -> None:
+        await connection.rollback()
+
+    @asynccontextmanager
+    async def transaction(self, readonly: bool = False) -> AsyncIterator['Transaction']:
+        """
+        Usage: `async with db.transaction() as tx: await tx.execute(...)`.
+        Pins one connection, committed once at the end, rolled back on exception or if a statement failed.
+        :param readonly: Only pin the connection, no transaction is started nor ended.
+        :return: `Transaction` with the same methods.
+        """
+        async with self._acquire() as connection:
+            tx = Transaction(self, connection)
+            if readonly:
+                yield tx
+                return
+            await connection.begin()
+            try:
+                yield tx
+            except BaseException:
+                await connection.rollback()
+                raise
+            if tx.failed:
+                await connection.rollback()
+            else:
+                await connection.commit()
 
     async def execute(
             self,
@@ -54,33 +342,98 @@ class MySQL:
         :param args: Arguments passed to the SQL query.
         :return: Number of affected rows.
         """
-        async with self.pool.acquire() as connection:
+        async with self._acquire() as connection:
             async with connection.cursor(DictCursor) as cursor:
                 try:
-                    await cursor.execute(query, self._parse(args))
-                    await connection.commit()
+                    await self._execute(cursor, query, args)
                 except errors.Error as e:
                     self.logger.exception(e)
-                    await connection.rollback()
+                    await self._rollback(connection)
                 return cursor.lastrowid or cursor.rowcount
 
+    async def executemany(
+            self,
+            query: str,
+            rows: Iterable[Union[tuple[Any, ...], dict[str, Any]]],
+            chunk_size: int = 1000,
+    ) -> int:
+        """
+        Executes SQL query for every row in one transaction, `INSERT`/`REPLACE ... VALUES` queries are sent
+        as multi-row statements of `chunk_size` rows. Rolls back on error.
+        :param query: SQL query to execute.
+        :param rows: Arguments passed to the SQL query, one per execution.
+        :param chunk_size: Rows per statement.
+        :return: Number of affected rows, 0 if rolled back.
+        """
+        async with self.transaction() as tx, tx._acquire() as connection:
+            async with connection.cursor() as cursor:
+                try:
+                    affected = 0
+                    for chunk in utils.chunks(rows, chunk_size):
+                        started = time.perf_counter()
+                        affected += await cursor.executemany(query, chunk) or 0
+                        self.metrics.executed(query, time.perf_counter() - started)
+                    return affected
+                except errors.Error as e:
+                    self.logger.exception(e)
+                    await tx._rollback(connection)
+                    return 0
+
+    async def insert(
+            self,
+            table: str,
+            rows: Iterable[dict[str, Any]],
+            chunk_size: int = 1000,
+    ) -> int:
+        """
+        Bulk insert of rows with the same columns, see `executemany`.
+        :param table: Table to insert into.
+        :param rows: Rows as column: value.
+        :param chunk_size: Rows per `INSERT`.
+        :return: Number of inserted rows.
+        """
+        iterator = iter(rows)
+        if (first := next(iterator, None)) is None:
+            return 0
+        columns = ', '.join(f'`{column}`' for column in first)
+        values = ', '.join(f'%({column})s' for column in first)
+        return await self.executemany(
+            f'INSERT INTO `{table}` ({columns}) VALUES ({values})',
+            _chain((first,), iterator),
+            chunk_size=chunk_size,
+        )
+
     async def select(
             self,
             query: str,
             args: Union[tuple[Any, ...], dict[str, Any], Any] = (),
+            stream: bool = False,
+            batch_size: int = 1000,
     ) -> AsyncGenerator[types.AttrDict[str, Any], None]:
         """
         Generator that yields rows.
         :param query: SQL query to execute.
         :param args: Arguments passed to the SQL query.
+        :param stream: Read rows from an unbuffered server-side cursor, `batch_size` rows at once,
+        instead of the whole result first. The connection is held until the generator is exhausted or closed.
+        :param batch_size: Rows fetched at once when streaming.
         :return: Yields rows one by one.
         """
-        async with self.pool.acquire() as connection:
-            async with connection.cursor(DictCursor) as cursor:
-                await cursor.execute(query, self._parse(args))
-                await connection.commit()
+        async with self._acquire() as connection:
+            async with connection.cursor(SSCursor if stream else Cursor) as cursor:
+                try:
+                    await self._execute(cursor, query, args)
+                except errors.Error:
+                    await self._rollback(connection)
+                    raise
+                row = self._rows(cursor)
+                if stream:
+                    while records := await cursor.fetchmany(batch_size):
+                        for record in records:
+                            yield row(record)
+                    return
                 while record := await cursor.fetchone():
-                    yield types.AttrDict(record)
+                    yield row(record)
 
     async def one(
             self,
@@ -93,14 +446,16 @@ class MySQL:
         :param args: Arguments passed to the SQL query.
         :return: A row or a list of rows.
         """
-        async with self.pool.acquire() as connection:
-            async with connection.cursor(DictCursor) as cursor:
+        async with self._acquire() as connection:
+            async with connection.cursor(Cursor) as cursor:
                 try:
-                    await cursor.execute(query, self._parse(args))
-                    await connection.commit()
-                    return types.AttrDict(await cursor.fetchone() or dict())
+                    await self._execute(cursor, query, args)
+                    if (record := await cursor.fetchone()) is None:  # empty `AttrDict` as it was
+                        return types.AttrDict() if self.row_factory == 'attrdict' else None
+                    return self._rows(cursor)(record)
                 except errors.Error as e:
                     self.logger.error(e)
+                    await self._rollback(connection)
 
     async def all(
             self,
@@ -113,14 +468,15 @@ class MySQL:
         :param args: Arguments passed to the SQL query.
         :return: A row or a list of rows.
         """
-        async with self.pool.acquire() as connection:
-            async with connection.cursor(DictCursor) as cursor:
+        async with self._acquire() as connection:
+            async with connection.cursor(Cursor) as cursor:
                 try:
-                    await cursor.execute(query, self._parse(args))
-                    await connection.commit()
-                    return [types.AttrDict(row) for row in await cursor.fetchall()]
+                    await self._execute(cursor, query, args)
+                    row = self._rows(cursor)
+                    return [row(record) for record in await cursor.fetchall()]
                 except errors.Error as e:
                     self.logger.error(e)
+                    await self._rollback(connection)
 
     async def count(
             self,
@@ -133,16 +489,52 @@ class MySQL:
         :param args: Arguments passed to the SQL query.
         :return: Number of affected rows.
         """
-        async with self.pool.acquire() as connection:
+        async with self._acquire() as connection:
             async with connection.cursor(DictCursor) as cursor:
                 try:
-                    await cursor.execute(query, self._parse(args))
-                    await connection.commit()
+                    await self._execute(cursor, query, args)
                     return cursor.rowcount
                 except errors.Error as e:
                     self.logger.error(e)
+                    await self._rollback(connection)
                     return 0
 
     @staticmethod
     def _parse(args: Any) -> tuple[Any, ...]:
         return (args,) if not isinstance(args, (tuple, dict)) else args
+
+
+class TransactionFailed(errors.Error):
+    """
+    Raised by statements of a `Transaction` after one of them failed.
+    """
+
+
+class Transaction(MySQL):
+    """
+    `MySQL` methods on the connection pinned by `MySQL.transaction`, failed statements mark it `failed`.
+    Once `failed`, further statements raise `TransactionFailed`: the connection is in autocommit mode,
+    so after the server rolled back (e.g. a deadlock) they would be committed one by one.
+    """
+
+    def __init__(self, db: MySQL, connection: aiomysql.Connection):  # shares the configuration of `db`
+        vars(self).update(vars(db))
+        self.db: MySQL = db
+        self.connection: aiomysql.Connection = connection
+        self.failed: bool = False
+
+    @asynccontextmanager
+    async def _acquire(self) -> AsyncIterator[aiomysql.Connection]:
+        if self.failed:
+            raise TransactionFailed('A statement of the transaction failed, it is rolled back')
+        yield self.connection
+
+    async def _rollback(self, connection: aiomysql.Connection) -> None:
+        self.failed = True  # rolled back by `MySQL.transaction`
+
+    @asynccontextmanager
+    async def transaction(self, readonly: bool = False) -> AsyncIterator['Transaction']:
+        """
+        Nested transactions are part of this one.
+        """
+        yield self
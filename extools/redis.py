@@ -1,33 +1,148 @@
 from typing import Optional, Any, Union, AsyncGenerator
 from aioredis import Redis as _Redis
+from aioredis.connection import Connection
+from aioredis.exceptions import ResponseError, ConnectionError as RedisConnectionError
 from contextlib import suppress
+import asyncio
 
-from . import types, json
+from . import types, json, utils, codecs
 
 
 class Redis(_Redis):
-    async def clear(self) -> None:
-        async for key in self.scan_iter():
-            await self.delete(key)
+    batch_size: int = 1000  # keys per SCAN COUNT, UNLINK and MGET
 
+    async def clear(self, batch_size: Optional[int] = None) -> None:
+        """
+        Unlinks every key of the database, `batch_size` keys per command.
+        """
+        size = batch_size or self.batch_size
+        keys = []
+        async for key in self.scan_iter(count=size):
+            keys.append(key)
+            if len(keys) >= size:
+                await self.unlink(*keys)
+                keys = []
+        if keys:
+            await self.unlink(*keys)
+
+
+class RedisLookup(Redis):
+    """
+    Finds keys by their `field:value` segments, e.g. `pool:address:0x...:chain:1:` by `chain=1`.
+    By default every lookup SCANs the keyspace and a key matching any of the fields is found.
+    With `indexed`, `set` and `delete` keep a set of keys per `field:value` (under `index_prefix`) in the same
+    transaction as the write, and lookups intersect them: a key must match all the fields.
+    Keys that expired are pruned from the index when found, `reindex` indexes keys written before.
+    """
+    indexed: bool = False
+    index_prefix: str = 'index'
+
+    def _indexes(self, name: str) -> list[str]:
+        """
+        :return: Index of every `field:value` pair of segments matched by `*:field:value:*`.
+        """
+        segments = name.split(':')
+        return [f'{self.index_prefix}:{k}:{v}' for k, v in zip(segments[1:-2], segments[2:-1])]
+
+    # override
+    async def set(self, name: str, value: Any, *args: Any, **kwargs: Any) -> Any:
+        if not self.indexed:
+            return await super().set(name, value, *args, **kwargs)
+        async with self.pipeline(transaction=True) as pipe:
+            pipe.set(name, value, *args, **kwargs)
+            for index in self._indexes(name):
+                pipe.sadd(index, name)
+            return (await pipe.execute())[0]
+
+    # override
+    async def delete(self, *names: str) -> int:
+        if not self.indexed:
+            return await super().delete(*names)
+        async with self.pipeline(transaction=True) as pipe:
+            pipe.delete(*names)
+            for name in names:
+                for index in self._indexes(name):
+                    pipe.srem(index, name)
+            return (await pipe.execute())[0]
+
+    async def reindex(self, batch_size: Optional[int] = None) -> None:
+        """
+        Indexes every key, `batch_size` keys per pipeline.
+        """
+        size = batch_size or self.batch_size
+        keys = []
+        async for key in self.scan_iter(count=size):
+            if not key.startswith(f'{self.index_prefix}:'):
+                keys.append(key)
+            if len(keys) >= size:
+                await self._index(keys)
+                keys = []
+        if keys:
+            await self._index(keys)
+
+    async def _index(self, names: list[str]) -> None:
+        async with self.pipeline(transaction=False) as pipe:
+            for name in names:
+                for index in self._indexes(name):
+                    pipe.sadd(index, name)
+            await pipe.execute()
+
+    async def _prune(self, names: list[str]) -> list[str]:
+        """
+        :return: Existing keys of `names`, the others are removed from the index.
+        """
+        async with self.pipeline(transaction=False) as pipe:
+            for name in names:
+                pipe.exists(name)
+            exists = await pipe.execute()
+        if stale := [name for name, found in zip(names, exists) if not found]:
+            async with self.pipeline(transaction=False) as pipe:
+                for name in stale:
+                    for index in self._indexes(name):
+                        pipe.srem(index, name)
+                await pipe.execute()
+        return [name for name, found in zip(names, exists) if found]
 
-class RedisLookup(Redis):  # TODO: speedup
     async def findkey(self, **kwargs: Any) -> Optional[str]:
         async for key in self.findkeys(**kwargs):
             return key
 
     async def findkeys(self, **kwargs: Any) -> AsyncGenerator[str, None]:
+        if self.indexed and kwargs:
+            names = list(await self.sinter(*(f'{self.index_prefix}:{k}:{v}' for k, v in kwargs.items())))
+            for i in range(0, len(names), self.batch_size):
+                for key in await self._prune(names[i:i + self.batch_size]):
+                    yield key
+            return
         for k, v in kwargs.items():
-            async for key in self.scan_iter(match=f'*:{k}:{v}:*'):
+            async for key in self.scan_iter(match=f'*:{k}:{v}:*', count=self.batch_size):
                 yield key
 
     async def findone(self, **kwargs: Any) -> Optional[Any]:
         async for value in self.findall(**kwargs):
             return value
 
-    async def findall(self, **kwargs: Any) -> AsyncGenerator[Any, None]:
+    async def findall(self, batch_size: Optional[int] = None, **kwargs: Any) -> AsyncGenerator[Any, None]:
+        """
+        :param batch_size: Values read per MGET.
+        """
+        size = batch_size or self.batch_size
+        keys = []
         async for key in self.findkeys(**kwargs):
-            yield await self.get(key)
+            keys.append(key)
+            if len(keys) >= size:
+                for value in await self.getmany(keys):
+                    yield value
+                keys = []
+        if keys:
+            for value in await self.getmany(keys):
+                yield value
+
+    async def getmany(self, names: list[str]) -> list[Optional[Any]]:
+        """
+        `get` of many keys in one MGET.
+        """
+        return await self.mget(names)
 
     @staticmethod
     def extract(key: str, what: str) -> Optional[str]:
@@ -35,17 +150,252 @@ class RedisLookup(Redis):  # TODO: speedup
         return data[data.index(what) + 1]
 
 
+def _str(value: Any) -> Any:
+    """
+    :return: `value` decoded if bytes, as pushed to connections not decoding responses.
+    """
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _copy(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
 class RedisJSON(RedisLookup):
+    """
+    Values are dicts stored as JSON and read as `types.AttrDict`.
+    After `track`, parsed values are kept in a near cache (`near`, an in-process `utils.TTLCache`), copied
+    (nested dicts and lists included) and wrapped on every `get`, so callers can mutate what they get.
+    Entries are invalidated by Redis (6+) server-assisted client tracking in BCAST mode, redirected to
+    a dedicated connection subscribed to `__redis__:invalidate`; without tracking they expire after `ttl`.
+    With a `codec`, dicts are written as tagged bytes (e.g. `codecs.Codec('msgpack', compression='zstd')`)
+    and values are read without decoding responses; values of any codec and legacy JSON text can be read.
+    Every client reading values of a codec must have one set.
+    """
+    codec: Optional[codecs.Codec] = None
+    wrapper: type[dict] = types.AttrDict  # or `types.LazyAttrDict`, `dict`
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.near: Optional[utils.TTLCache] = None
+        self.ttl: Optional[float] = None
+        self.tracking: bool = False
+        self.invalidations: int = 0
+        self._reading: dict[str, int] = {}  # key: concurrent reads from Redis
+        self._invalidated: set[str] = set()  # keys invalidated while being read
+        self._listener: Optional[asyncio.Task] = None
+        self._connections: list[Connection] = []
+        self._raw: Optional[_Redis] = None
+
+    def _parse(self, value: Any) -> Optional[Any]:
+        """
+        :return: Value of a `codecs.Codec`, dict of a JSON object, the value itself otherwise.
+        """
+        if isinstance(value, bytes):  # read with `codec`
+            if codecs.Codec.tagged(value):
+                return codecs.Codec.loads(value)
+            if self.codec is None:  # not decoding responses
+                return value or None
+            if self.connection_pool.connection_kwargs.get('decode_responses'):
+                value = value.decode()
+        if value and isinstance(value, (str, bytes)):
+            with suppress(ValueError):
+                if isinstance(parsed := json.loads(value), dict):
+                    return parsed
+        return value or None
+
+    def _wrap(self, parsed: Optional[Any], copy: bool = False) -> Optional[Any]:
+        """
+        :param copy: Copy nested dicts and lists too, for `parsed` kept in the near cache.
+        """
+        if copy:
+            parsed = _copy(parsed)
+        return self.wrapper(parsed) if isinstance(parsed, dict) else parsed
+
+    def _decode(self, value: Any) -> Optional[Any]:
+        return self._wrap(self._parse(value))
+
+    @property
+    def raw(self) -> _Redis:
+        """
+        Client of the same server not decoding responses, values written by `codec` are binary.
+        """
+        if self._raw is None:
+            pool = self.connection_pool
+            self._raw = _Redis(connection_pool=pool.__class__(
+                connection_class=pool.connection_class,
+                max_connections=pool.max_connections,
+                **(pool.connection_kwargs | {'decode_responses': False}),
+            ))
+        return self._raw
+
+    async def track(
+            self,
+            size: int = 10_000,
+            ttl: Optional[float] = None,
+            prefixes: tuple[str, ...] = (),
+            tracking: bool = True,
+    ) -> bool:
+        """
+        Enables the near cache.
+        :param ttl: Max seconds a value is cached, required without tracking.
+        :param prefixes: Keys to be tracked, all if empty.
+        :param tracking: Use client tracking if the server supports it.
+        :return: Whether client tracking is used, entries only expire after `ttl` otherwise.
+        """
+        self.near, self.ttl = utils.TTLCache(maxsize=size), ttl
+        if tracking:
+            with suppress(ResponseError, RedisConnectionError, OSError):
+                await self._subscribe(prefixes)
+                self._listener = asyncio.create_task(self._listen(prefixes))
+        if not self.tracking and ttl is None:
+            self.near = None
+        return self.tracking
+
+    async def untrack(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._listener
+        await self._disconnect()
+        self.near, self._listener = None, None
+
+    # override
+    async def close(self, *args: Any, **kwargs: Any) -> None:
+        await self.untrack()
+        if self._raw is not None:
+            await self._raw.connection_pool.disconnect()
+            self._raw = None
+        await super().close(*args, **kwargs)
+
+    async def _read(self, name: str) -> Any:
+        return await (super().get(name) if self.codec is None else self.raw.get(name))
+
+    async def _command(self, connection: Connection, *args: Any) -> Any:
+        await connection.send_command(*args)
+        response = await connection.read_response()
+        if isinstance(response, ResponseError):
+            raise response
+        return response
+
+    async def _subscribe(self, prefixes: tuple[str, ...]) -> None:
+        """
+        Opens the subscriber and the (otherwise idle) connection whose tracking redirects to it:
+        in BCAST mode, invalidations don't depend on the keys read through the connection.
+        """
+        subscriber = self.connection_pool.make_connection()
+        tracker = self.connection_pool.make_connection()
+        self._connections = [subscriber, tracker]
+        try:
+            for connection in self._connections:
+                await connection.connect()
+            client_id = await self._command(subscriber, 'CLIENT', 'ID')
+            await self._command(subscriber, 'SUBSCRIBE', '__redis__:invalidate')
+            await self._command(
+                tracker, 'CLIENT', 'TRACKING', 'ON', 'REDIRECT', client_id, 'BCAST',
+                *(arg for prefix in prefixes for arg in ('PREFIX', prefix)),
+            )
+        except BaseException:
+            await self._disconnect()
+            raise
+        self.tracking = True
+
+    async def _disconnect(self) -> None:
+        self.tracking = False
+        for connection in self._connections:
+            with suppress(Exception):
+                await connection.disconnect()
+        self._connections = []
+
+    async def _listen(self, prefixes: tuple[str, ...]) -> None:
+        """
+        Drops invalidated keys, the whole cache when tracking is interrupted (then reconnects).
+        """
+        delay = 0.5
+        while True:
+            with suppress(RedisConnectionError, OSError):
+                while True:
+                    message = await self._connections[0].read_response()
+                    if isinstance(message, list) and _str(message[0]) == 'message':
+                        self.invalidations += 1
+                        self._invalidate(None if message[2] is None else [_str(key) for key in message[2]])
+            await self._disconnect()
+            self.near.clear()
+            while not self.tracking:
+                await asyncio.sleep(delay)
+                try:
+                    await self._subscribe(prefixes)
+                except (ResponseError, RedisConnectionError, OSError):
+                    delay = min(delay * 2, 30)
+                else:
+                    delay = 0.5
+
+    def _invalidate(self, keys: Optional[list[str]]) -> None:
+        """
+        :param keys: `None` when the database was flushed.
+        """
+        if keys is None:
+            self.near.clear()
+            self._invalidated.update(self._reading)
+            return
+        for key in keys:
+            self.near.pop(key, None)
+            if key in self._reading:
+                self._invalidated.add(key)
+
+    def _forget(self, *names: str) -> None:
+        if self.near is not None:
+            self._invalidate(list(names))
+
     # override
     async def get(self, name: str) -> Optional[types.AttrDict[str, Any]]:
-        if value := await super().get(name):
-            if isinstance(value, str):
-                with suppress(Exception):
-                    return types.AttrDict(json.loads(value))
-            return value
+        if self.near is None:
+            return self._decode(await self._read(name))
+        parsed, fresh = self.near.lookup(name)
+        if fresh:
+            return self._wrap(parsed, copy=True)
+        self._reading[name] = self._reading.get(name, 0) + 1
+        try:
+            parsed = self._parse(await self._read(name))
+            if parsed is not None and name not in self._invalidated and self.near is not None \
+                    and (self.tracking or self.ttl is not None):  # not while tracking reconnects
+                self.near.set(name, parsed, ttl=float('inf') if self.ttl is None else self.ttl)
+        finally:
+            if (count := self._reading.pop(name) - 1) > 0:
+                self._reading[name] = count
+            else:
+                self._invalidated.discard(name)
+        return self._wrap(parsed, copy=True)
+
+    # override
+    async def getmany(self, names: list[str]) -> list[Optional[Any]]:
+        values = await (super().getmany(names) if self.codec is None else self.raw.mget(names))
+        return [self._decode(value) for value in values]
 
     # override
-    async def set(self, name: str, value: Union[str, dict[Any, Any]], *args):
+    async def set(self, name: str, value: Union[str, dict[Any, Any]], *args, **kwargs):
         if isinstance(value, dict):
-            value = json.dumps(value)
-        return await super().set(name, value, *args)
\ No newline at end of file
+            value = json.dumps(value) if self.codec is None else self.codec.dumps(value)
+        try:
+            return await super().set(name, value, *args, **kwargs)
+        finally:
+            self._forget(name)
+
+    # override
+    async def delete(self, *names: str) -> int:
+        try:
+            return await super().delete(*names)
+        finally:
+            self._forget(*names)
+
+    # override
+    async def clear(self, batch_size: Optional[int] = None) -> None:
+        try:
+            await super().clear(batch_size=batch_size)
+        finally:
+            if self.near is not None:
+                self._invalidate(None)
@@ -38,6 +38,33 @@ class AttrDict(dict):
         self[key] = value
 
 
+class LazyAttrDict(dict):
+    """
+    `AttrDict` wrapping nested dicts when they are accessed instead of when it is created,
+    attribute lookup only falls back to keys when there is no such attribute.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key: Any) -> Any:
+        value = dict.__getitem__(self, key)
+        if type(value) is dict:
+            value = LazyAttrDict(value)
+            dict.__setitem__(self, key, value)
+        return value
+
+    def __getattr__(self, item: str) -> Any:
+        if item not in self:
+            raise AttributeError(f"'{self.__class__.__name__}' has no attribute '{item}'")
+        value = dict.__getitem__(self, item)
+        if type(value) is dict:
+            value = LazyAttrDict(value)
+            dict.__setitem__(self, item, value)
+        return value
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        self[key] = value
+
+
 class HexStr(str):
     @classmethod
     def process(cls, address: Union[str, w3types.HexBytes]) -> str:
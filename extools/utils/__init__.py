@@ -6,7 +6,17 @@ from ._datetime import (
 from ._asyncio import (
     aenumerate,
 )
+from ._collections import (
+    LRUCache,
+    TTLCache,
+    chunks,
+)
+from ._ratelimit import (
+    TokenBucket,
+    RedisTokenBucket,
+)
 from ._web3 import (
     keccak256,
     to_checksum_address,
+    to_checksum_addresses,
 )
@@ -0,0 +1,81 @@
+from typing import Any, Hashable, Iterable, Iterator
+from collections import OrderedDict
+from itertools import islice
+import time
+
+
+class LRUCache(OrderedDict):
+    """
+    Bounded mapping evicting the least recently used key, counts `get` hits and misses.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        super().__init__()
+        self.maxsize: int = maxsize
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if key in self:
+            self.move_to_end(key)
+            self.hits += 1
+            return self[key]
+        self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self[key] = value
+        self.move_to_end(key)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0
+
+
+class TTLCache(LRUCache):
+    """
+    `LRUCache` of values fresh for `ttl` sec after `set`, then stale for `stale_ttl` more sec.
+    `lookup` counts fresh `hits`, `stale` hits and `misses`.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        super().__init__(maxsize=maxsize)
+        self.stale: int = 0
+
+    def lookup(self, key: Hashable) -> tuple[Any, bool]:
+        """
+        :return: Value (`None` if missing or expired) and whether it is fresh.
+        """
+        if (entry := super().get(key)) is None:
+            return None, False
+        value, fresh_until, stale_until = entry
+        now = time.monotonic()
+        if now < fresh_until:
+            return value, True
+        self.hits -= 1  # counted by `get`
+        if now < stale_until:
+            self.stale += 1
+            return value, False
+        del self[key]
+        self.misses += 1
+        return None, False
+
+    def set(self, key: Hashable, value: Any, ttl: float = float('inf'), stale_ttl: float = 0) -> None:
+        now = time.monotonic()
+        super().set(key, (value, now + ttl, now + ttl + stale_ttl))
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.stale + self.misses
+        return (self.hits + self.stale) / total if total else 0.0
+
+
+def chunks(iterable: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    """
+    :return: Lists of `size` consecutive elements, the last one may be shorter.
+    """
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
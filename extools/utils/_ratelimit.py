@@ -0,0 +1,110 @@
+from typing import TYPE_CHECKING
+import asyncio
+import time
+
+if TYPE_CHECKING:
+    from aioredis import Redis
+
+
+class TokenBucket:
+    """
+    Async token bucket (as GCRA: only the theoretical arrival time is stored): up to `burst` acquisitions
+    pass at once, then one per `1 / rate` sec. Every `acquire` reserves its slot synchronously, so
+    concurrent waiters are served in arrival order instead of waking up and bursting together.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        :param rate: Tokens per second.
+        :param burst: Bucket capacity.
+        """
+        self.rate: float = rate
+        self.burst: int = burst
+        self.tat: float = float('-inf')  # theoretical arrival time of the next token
+        self.blocked_until: float = float('-inf')
+
+    @property
+    def interval(self) -> float:
+        return 1 / self.rate
+
+    def _reserve(self, now: float) -> float:
+        """
+        :return: Seconds to wait for the reserved token.
+        """
+        self.tat = max(self.tat, now) + self.interval
+        return max(0.0, self.tat - self.burst * self.interval - now)
+
+    async def acquire(self) -> None:
+        while True:
+            delay = self._reserve(time.monotonic())
+            try:
+                if delay:
+                    await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.tat -= self.interval  # give the slot back
+                raise
+            if time.monotonic() >= self.blocked_until:
+                return
+            # `block`ed while waiting: the slot was handed out before the block, take one after it
+
+    async def block(self, seconds: float) -> None:
+        """
+        Stops handing out tokens for `seconds` (e.g. `Retry-After` of a 429), then resumes without a burst:
+        waiters holding a slot within the block take a new one after it.
+        """
+        now = time.monotonic()
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tat = max(self.tat, self.blocked_until + (self.burst - 1) * self.interval)
+
+
+class RedisTokenBucket(TokenBucket):
+    """
+    `TokenBucket` with its state in Redis under `key`, shared by every process using the same key.
+    Reservations are made atomically by a Lua script on the server clock, the end of a block is kept
+    under `key:blocked`.
+    """
+
+    # KEYS: tat key, blocked until key; ARGV: interval, burst, blocked for (0 to reserve a token),
+    # 1 if a token was reserved already (a new one is only reserved if blocked meanwhile)
+    SCRIPT = '''
+        local interval, burst, blocked = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+        local time = redis.call('TIME')
+        local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+        local blocked_until = tonumber(redis.call('GET', KEYS[2]) or 0)
+        if ARGV[4] == '1' and now >= blocked_until then
+            return '0'
+        end
+        local tat = math.max(tonumber(redis.call('GET', KEYS[1]) or 0), now)
+        local delay = 0
+        if blocked > 0 then
+            blocked_until = math.max(blocked_until, now + blocked)
+            redis.call('SET', KEYS[2], tostring(blocked_until), 'PX', math.ceil((blocked_until - now) * 1000))
+            tat = math.max(tat, blocked_until + (burst - 1) * interval)
+        else
+            tat = tat + interval
+            delay = math.max(0, tat - burst * interval - now)
+        end
+        redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil((tat - now) * 1000) + 1000)
+        return tostring(delay)
+    '''
+
+    def __init__(self, redis: 'Redis', key: str, rate: float, burst: int = 1):
+        super().__init__(rate=rate, burst=burst)
+        self.redis: 'Redis' = redis
+        self.key: str = key
+        self._script = redis.register_script(self.SCRIPT)
+
+    async def _call(self, blocked: float, reserved: bool = False) -> float:
+        return float(await self._script(
+            keys=[self.key, f'{self.key}:blocked'],
+            args=[self.interval, self.burst, blocked, int(reserved)],
+        ))
+
+    async def acquire(self) -> None:
+        delay = await self._call(0)
+        while delay:
+            await asyncio.sleep(delay)
+            delay = await self._call(0, reserved=True)  # 0 unless `block`ed while waiting
+
+    async def block(self, seconds: float) -> None:
+        await self._call(seconds)
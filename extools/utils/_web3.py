@@ -1,6 +1,11 @@
+from typing import Iterable
+from functools import lru_cache
 from Crypto.Hash import keccak  # pycryptodome
 
 
+CHECKSUM_CACHE_SIZE: int = 65536
+
+
 def keccak256(data: bytes, /) -> str:
     """
     :param data:
@@ -9,7 +14,26 @@ def keccak256(data: bytes, /) -> str:
     return '0x' + keccak.new(data=data, digest_bits=256).hexdigest()
 
 
+@lru_cache(maxsize=CHECKSUM_CACHE_SIZE)
+def _checksum(address: str, /) -> str:
+    """
+    EIP-55 checksum computed on the raw digest, nibble `2i` of the hash is the high nibble of byte `i`.
+    :param address: Lowercased address without '0x'.
+    :return: Checksummed address.
+    """
+    digest = keccak.new(data=address.encode(), digest_bits=256).digest()
+    chars = list(address)
+    for i in range(20):
+        if digest[i] & 0x80:
+            chars[2 * i] = chars[2 * i].upper()
+        if digest[i] & 0x08:
+            chars[2 * i + 1] = chars[2 * i + 1].upper()
+    return '0x' + ''.join(chars)
+
+
 def to_checksum_address(address: str):
-    address = address.lower()
-    hash = keccak256(address[2:].encode())
-    return '0x' + ''.join(address[i].upper() if int(hash[i], 16) > 7 else address[i] for i in range(2, 42))
+    return _checksum(address[2:].lower())
+
+
+def to_checksum_addresses(addresses: Iterable[str]) -> list[str]:
+    return [_checksum(address[2:].lower()) for address in addresses]
@@ -0,0 +1,88 @@
+import asyncio
+
+from aiohttp import web
+
+from extools import jsonrpc
+from extools.jsonrpc import _multicall
+
+
+CONTRACTS = ['0x' + str(i) * 40 for i in range(1, 4)]
+
+
+def _word(value: int) -> str:
+    return format(value, '064x')
+
+
+def _returned(results: list[tuple[bool, str]]) -> str:
+    """
+    ABI-encodes `aggregate3` return data, see `_multicall.decode`.
+    """
+    head, tail, offset = [], [], 32 * len(results)
+    for success, data in results:
+        data = data[2:]
+        padded = data + '0' * (-len(data) % 64)
+        head.append(_word(offset))
+        tail.append(_word(int(success)) + _word(64) + _word(len(data) // 2) + padded)
+        offset += 96 + len(padded) // 2
+    return '0x' + _word(32) + _word(len(results)) + ''.join(head) + ''.join(tail)
+
+
+def test_decode_roundtrip():
+    results = [(True, '0x' + _word(18)), (False, '0x')]
+    assert _multicall.decode(_returned(results)) == results
+
+
+def test_unpack_empty_result():
+    """
+    Multicall3 isn't deployed (or not yet at the pinned block): `eth_call` returns `0x`.
+    """
+    unpacked = _multicall.unpack({'a': {'jsonrpc': '2.0', 'id': 'a', 'result': '0x'}}, {'a': ['x', 'y']})
+    assert unpacked.keys() == {'x', 'y'}
+    assert all(response['error']['code'] is None for response in unpacked.values())
+
+
+def test_unpack_short_result():
+    result = _returned([(True, '0x' + _word(18))])
+    unpacked = _multicall.unpack({'a': {'jsonrpc': '2.0', 'id': 'a', 'result': result}}, {'a': ['x', 'y']})
+    assert unpacked.keys() == {'x', 'y'}
+    assert all('error' in response for response in unpacked.values())
+
+
+def test_unpack_reverted_aggregate():
+    error = {'code': 3, 'message': 'execution reverted'}
+    unpacked = _multicall.unpack({'a': {'jsonrpc': '2.0', 'id': 'a', 'error': error}}, {'a': ['x', 'y']})
+    assert all(jsonrpc.JsonRpcClient._retryable(response) for response in unpacked.values())
+
+
+def test_client_resends_alone_without_multicall3():
+    received = []
+
+    async def handler(request: web.Request) -> web.Response:
+        calls = await request.json()
+        received.append([call['params'][0]['to'] for call in calls])
+        return web.json_response([
+            {
+                'jsonrpc': '2.0',
+                'id': call['id'],
+                'result': '0x' if call['params'][0]['to'] == _multicall.ADDRESS else '0x' + _word(18),
+            }
+            for call in calls
+        ])
+
+    async def main() -> tuple:
+        app = web.Application()
+        app.router.add_post('/', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        try:
+            async with jsonrpc.JsonRpcClient(f'http://127.0.0.1:{port}/', multicall=10, backoff=0) as client:
+                return await client.request(jsonrpc.Batch(jsonrpc.payloads.decimals(contract) for contract in CONTRACTS))
+        finally:
+            await runner.cleanup()
+
+    assert asyncio.run(main()) == (18, 18, 18)
+    assert received[0] == [_multicall.ADDRESS]
+    assert len(received[1]) == len(CONTRACTS) and _multicall.ADDRESS not in received[1]
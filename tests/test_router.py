@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import time
+
+from aiohttp import web
+
+from extools import jsonrpc, json
+
+
+logging.getLogger('aiohttp.server').setLevel(logging.CRITICAL)  # hedged duplicates that lost are cancelled
+
+
+class Node:
+    """
+    Local stand-in for an Ethereum node answering every call with `0x1` after `delay` sec, or 503 if `failing`.
+    """
+
+    def __init__(self, delay: float = 0.0, failing: bool = False):
+        self.delay: float = delay
+        self.failing: bool = failing
+        self.requests: int = 0
+        self.runner: web.AppRunner = web.AppRunner(web.Application())
+        self.runner.app.router.add_post('/', self.handle)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        await asyncio.sleep(self.delay)
+        if self.failing:
+            return web.Response(status=503)
+        calls = json.loads(await request.read())
+        return web.Response(body=json.dumpb([{'jsonrpc': '2.0', 'id': c['id'], 'result': '0x1'} for c in calls]))
+
+    async def start(self) -> str:
+        await self.runner.setup()
+        await web.TCPSite(self.runner, '127.0.0.1', 0).start()
+        return f'http://127.0.0.1:{self.runner.addresses[0][1]}/'
+
+
+def payload(size: int = 10) -> jsonrpc.Batch:
+    return jsonrpc.Batch(jsonrpc.payloads.balance('0x28c6c06298d514db089934071355e5743bf21d60') for _ in range(size))
+
+
+def run(nodes: list[Node], test, **kwargs) -> None:
+    async def main() -> None:
+        urls = [await node.start() for node in nodes]
+        try:
+            async with jsonrpc.JsonRpcRouter(urls=urls, backoff=0, **kwargs) as router:
+                await test(router)
+        finally:
+            for node in nodes:
+                await node.runner.cleanup()
+
+    asyncio.run(main())
+
+
+def test_failover():
+    nodes = [Node(failing=True), Node()]
+
+    async def test(router: jsonrpc.JsonRpcRouter) -> None:
+        for _ in range(5):
+            assert await router.request(payload()) == (1,) * 10
+
+    run(nodes, test, hedge=False, retries=0)
+    assert nodes[1].requests == 5
+
+
+def test_hedging():
+    nodes = [Node(delay=2), Node()]
+
+    async def test(router: jsonrpc.JsonRpcRouter) -> None:
+        for _ in range(3):
+            started = time.monotonic()
+            assert await router.request(payload()) == (1,) * 10
+            assert time.monotonic() - started < 1
+        assert all(endpoint.inflight == 0 for endpoint in router.endpoints)
+
+    run(nodes, test, hedge_delay=0.05)
+
+
+def test_cancelled_request_cancels_attempts():
+    nodes = [Node(delay=2), Node(delay=2), Node(delay=2)]
+
+    async def test(router: jsonrpc.JsonRpcRouter) -> None:
+        task = asyncio.create_task(router.request(payload()))
+        await asyncio.sleep(0.5)  # hedged to every endpoint
+        assert sum(endpoint.inflight for endpoint in router.endpoints) == 3
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert all(endpoint.inflight == 0 for endpoint in router.endpoints)
+
+    run(nodes, test, hedge_delay=0.05)
+
+
+def test_ejection():
+    nodes = [Node(failing=True), Node()]
+
+    async def test(router: jsonrpc.JsonRpcRouter) -> None:
+        router.endpoints[1].latency = 100  # picked only when failing over, until the first one is ejected
+        for _ in range(router.eject_after):
+            assert await router.request(payload()) == (1,) * 10
+        assert router.healthy() == [router.endpoints[1]]
+        for _ in range(5):
+            await router.request(payload())
+        assert nodes[0].requests == router.eject_after
+
+    run(nodes, test, hedge=False, retries=0, eject_after=2)
@@ -0,0 +1,82 @@
+import asyncio
+
+from aiohttp import web
+
+from extools import jsonrpc, json
+
+
+async def node(request: web.Request) -> web.WebSocketResponse:
+    """
+    Local stand-in for an Ethereum node: a head every 10 ms after each subscription,
+    preceded by frames that aren't shaped like a response or notification.
+    """
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+
+    async def heads(subscription: str) -> None:
+        for frame in (42, [1], {'jsonrpc': '2.0', 'method': 'eth_subscription', 'params': {}}):
+            await ws.send_bytes(json.dumpb(frame))
+        for number in range(1000):
+            await asyncio.sleep(0.01)
+            if ws.closed:
+                return
+            notification = {'subscription': subscription, 'result': {'number': number}}
+            await ws.send_bytes(json.dumpb({'jsonrpc': '2.0', 'method': 'eth_subscription', 'params': notification}))
+
+    tasks = []
+    async for message in ws:
+        call = json.loads(message.data)
+        result = f'0x{len(tasks)}' if call['method'] == 'eth_subscribe' else True
+        await ws.send_bytes(json.dumpb({'jsonrpc': '2.0', 'id': call['id'], 'result': result}))
+        if call['method'] == 'eth_subscribe':
+            tasks.append(asyncio.create_task(heads(result)))
+    for task in tasks:
+        task.cancel()
+    return ws
+
+
+def run(test) -> None:
+    async def main() -> None:
+        app = web.Application()
+        app.router.add_get('/', node)
+        runner = web.AppRunner(app, shutdown_timeout=1)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', 0).start()
+        try:
+            await asyncio.wait_for(test(f'ws://127.0.0.1:{runner.addresses[0][1]}/'), timeout=5)
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(main())
+
+
+def test_unexpected_frames_are_skipped():
+    async def test(url: str) -> None:
+        async with jsonrpc.JsonRpcWebSocket(url, timeout=1) as ws:
+            numbers = []
+            async for head in ws.heads():
+                numbers.append(head['number'])
+                if len(numbers) == 3:
+                    break
+            assert numbers == [0, 1, 2]
+            assert not ws._reader.done()
+
+    run(test)
+
+
+def test_close_ends_subscriptions():
+    async def test(url: str) -> None:
+        ws = await jsonrpc.JsonRpcWebSocket(url, timeout=1).__aenter__()
+        numbers = []
+
+        async def consume() -> None:
+            async for head in ws.heads():
+                numbers.append(head['number'])
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0.1)
+        await ws.close()
+        await asyncio.sleep(0.1)
+        assert consumer.done() and numbers
+
+    run(test)